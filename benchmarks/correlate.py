@@ -0,0 +1,61 @@
+#! /usr/bin/env python
+"""
+Time `correlate.correlations` (or with --mode pearson or spearman,
+`correlate.sensitivities`) over a sweep of runs with many distinct arguments, with
+the metric files already cached and after they all change.
+"""
+
+import argparse
+from pathlib import Path
+import random
+import tempfile
+import timeit
+
+from runs.database import DataBase
+from runs.logger import Logger
+from runs.run_entry import RunEntry
+from runs.subcommands import correlate
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--runs", type=int, default=5000)
+    parser.add_argument("--args", type=int, default=300)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--mode", choices=correlate.MODES, default="indicator")
+    args = parser.parse_args()
+
+    random.seed(0)
+    with tempfile.TemporaryDirectory() as directory:
+        with DataBase(Path(directory, "runs.db"), Logger(quiet=True)) as db:
+            with db.batch():
+                for i in range(args.runs):
+                    flags = random.sample(range(args.args), 10)
+                    command = "python train.py " + " ".join(
+                        f"--a{j}={random.choice([1, 2, 4])}" for j in flags
+                    )
+                    run = RunEntry(f"run{i}", command, "", "2019-01-01T00:00:00", "")
+                    db.append(run)
+                    Path(directory, f"run{i}").write_text(str(random.random()))
+            condition = db.condition(["%"])
+            paths = [run.path for run in db.where(condition, columns=["path"])]
+
+            def correlations():
+                correlate.strings(
+                    mode=args.mode,
+                    logger=db.logger,
+                    db=db,
+                    condition=condition,
+                    paths=paths,
+                    value_path=Path(directory, "<path>"),
+                    prefix=None,
+                    runsrc_args=[],
+                )
+
+            print(f"{'first':>8} {timeit.timeit(correlations, number=1):>8.3f}s")
+            seconds = min(timeit.repeat(correlations, number=1, repeat=args.repeat))
+            print(f"{'cached':>8} {seconds:>8.3f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,52 @@
+#! /usr/bin/env python
+"""
+Time `Condition.compile` on trees shaped like the ones `DataBase.get` builds, for
+a growing number of predicates. The time per predicate should stay roughly
+constant.
+"""
+
+import argparse
+import timeit
+
+from runs.query import And, Any, GreaterThan, In, Like, Not
+
+
+def flat_tree(n: int):
+    patterns = Any(*[Like("path", f"exp{i}/%_") for i in range(n)])
+    active = In("path", *[f"exp{i}/run" for i in range(n)])
+    unless = Not(Any(*[Like("path", f"exp{i}/skip%") for i in range(n)]))
+    return And(patterns, GreaterThan("datetime", "2019-01-01"), active, unless)
+
+
+def deep_tree(n: int):
+    condition = Like("path", "exp/%")
+    for i in range(n):
+        condition = condition & Like("path", f"%{i}%")
+    return condition
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "--sizes", type=int, nargs="*", default=[100, 200, 400, 1000, 2000, 4000]
+    )
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"{'tree':>6} {'predicates':>10} {'seconds':>10} {'us/predicate':>13}")
+    for name, build, limit in [("flat", flat_tree, None), ("deep", deep_tree, 400)]:
+        for n in args.sizes:
+            if limit is not None and n > limit:
+                # deep trees are compiled recursively
+                continue
+
+            def compile_fresh():
+                # build a new tree each time so neither cache is hit
+                build(n).compile()
+
+            seconds = min(timeit.repeat(compile_fresh, number=1, repeat=args.repeat))
+            print(f"{name:>6} {n:>10} {seconds:>10.4f} {seconds / n * 1e6:>13.2f}")
+
+
+if __name__ == "__main__":
+    main()
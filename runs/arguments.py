@@ -1,8 +1,10 @@
+from argparse import ArgumentTypeError
 from copy import deepcopy
 from datetime import datetime, timedelta
-from pathlib import PurePath
+from pathlib import Path, PurePath
 import re
 
+from runs.query import parse_where
 from runs.run_entry import RunEntry
 
 
@@ -36,6 +38,13 @@ def date_parse(string):
     return datetime.strptime("2002-12-04", "%Y-%m-%dT%H:%M:%S.%f%z")
 
 
+def where_expression(string: str):
+    try:
+        return parse_where(string)
+    except ValueError as e:
+        raise ArgumentTypeError(str(e))
+
+
 DEFAULT_QUERY_ARGS = {
     "patterns": dict(
         nargs="*", type=PurePath, help="Look up runs matching these patterns"
@@ -44,11 +53,34 @@ DEFAULT_QUERY_ARGS = {
         nargs="*", type=PurePath, help="Exclude these paths from the search."
     ),
     "--active": dict(action="store_true", help="Include all active runs in query."),
+    "--from-file": dict(
+        type=Path,
+        help="Include runs whose paths are listed in this file, one per line.",
+    ),
     "--descendants": dict(
         action="store_true", help="Include all descendants of pattern."
     ),
+    "--case-sensitive": dict(
+        action="store_true",
+        help="Match patterns case-sensitively. By default, ASCII letters in patterns "
+        "match either case.",
+    ),
+    "--where": dict(
+        type=where_expression,
+        help="Only include runs whose command's arguments satisfy this expression, "
+        'e.g. "lr < 1e-3 and seed in (0, 1) and not cuda". A name on its own '
+        "tests for a flag.",
+    ),
+    "--explain": dict(
+        action="store_true",
+        help="Print the SQL query and SQLite's query plan instead of running it. "
+        "Only for subcommands that list runs, such as ls and lookup.",
+    ),
     "--sort": dict(
-        default="datetime", choices=RunEntry.fields(), help="Sort query by this field."
+        dest="order",
+        default="datetime",
+        choices=RunEntry.fields(),
+        help="Sort query by this field. Paths are sorted in natural order.",
     ),
     "--since": dict(
         default=None,
@@ -1,8 +1,11 @@
 import copy
+from enum import Enum, auto
+from functools import lru_cache
+import hashlib
 import itertools
+import json
 import re
-from enum import Enum, auto
-from typing import Generator, List, Set, Union
+from typing import Generator, List, Optional, Set, Union
 
 
 class Type(Enum):
@@ -11,6 +14,16 @@ class Type(Enum):
     UNCHANGED = auto()
 
 
+def key_matches(key: str, name: str) -> bool:
+    """
+    :return: whether argument `key` is called `name`. A name without leading dashes
+    matches regardless of the key's dashes, so "lr" matches "--lr".
+    """
+    if name.startswith("-"):
+        return key == name
+    return key.lstrip("-") == name
+
+
 class Command:
     def __init__(self, *args, path):
         self.path = path
@@ -79,6 +92,33 @@ class Command:
 
             yield k + ks + "".join(value_iterator())
 
+    def key_values(self) -> Generator:
+        """
+        Yield (key, value) for each positional, flag and optional argument, in that
+        order. Positionals have no key, flags have no value, and the words of a
+        multi-word value are joined by spaces.
+        """
+        for word, _ in self.positionals:
+            yield None, word
+        for word, _ in self.flags:
+            yield word, None
+        for (key, _), values in self.optionals:
+            yield key, " ".join(word for word, _ in values)
+
+    def arg(self, name: str) -> Optional[str]:
+        """
+        :return: the value of the last optional argument named `name`, with the
+        words of a multi-word value joined by spaces
+        """
+        value = None
+        for (key, _), values in self.optionals:
+            if key_matches(key, name):
+                value = " ".join(word for word, _ in values)
+        return value
+
+    def has_flag(self, name: str) -> bool:
+        return any(key_matches(word, name) for word, _ in self.flags)
+
     def __str__(self):
         def iterator():
             yield from self.positional_strings()
@@ -162,3 +202,30 @@ class Command:
         new_command.optionals = list(optionals())
         new_command.flags = list(flags())
         return new_command
+
+
+def config_hash(commit: str, command: Command) -> str:
+    """
+    :return: a hash of `commit` and the arguments of `command`, which does not depend
+    on the order of flags and optional arguments, on how keys are separated from
+    values, or on quotes
+    """
+    config = [
+        commit,
+        [word for word, _ in command.positionals],
+        sorted(word for word, _ in command.flags),
+        sorted(
+            [key, [word for word, _ in values]]
+            for (key, _), values in command.optionals
+        ),
+    ]
+    return hashlib.blake2b(json.dumps(config).encode(), digest_size=16).hexdigest()
+
+
+@lru_cache(maxsize=2 ** 12)
+def parse(command: str) -> Command:
+    """
+    Cached `Command` for a command string, shared between callers and so not to be
+    modified.
+    """
+    return Command(command, path=None)
@@ -1,40 +1,176 @@
 # stdlib
 from collections import namedtuple
+from contextlib import contextmanager
 from datetime import datetime, timedelta
 from functools import wraps
+import hashlib
+import json
+import math
 from pathlib import Path
+import random
 import sqlite3
-from typing import Iterable, List, Union
+import time
+from typing import (
+    Callable,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Set,
+    Tuple,
+    Union,
+)
 
 # first party
-from runs import query
+from runs import migrations, query
+from runs.command import parse as command_parse
 from runs.logger import Logger
-from runs.query import Condition, GreaterThan, In, Like
+from runs.query import Compiled, Condition, GreaterThan, In
 from runs.run_entry import RunEntry
 from runs.tmux_session import TMUXSession
-from runs.util import PurePath
+from runs.util import PurePath, epoch_microseconds, natural_compare, parse_isoformat
 
 PathLike = Union[str, PurePath, PurePath, Path]
 
-QueryArgs = namedtuple("QueryArgs", "patterns unless order descendants active")
+ARGS_TABLE = "run_args"
+SEARCH_TABLE = "runs_search"
+METRICS_TABLE = "run_metrics"
+
+QueryArgs = namedtuple(
+    "QueryArgs",
+    "patterns unless order descendants active case_sensitive from_file where",
+)
+
+# "delete" is SQLite's default rollback journal. "wal" lets readers proceed while
+# another process writes, which suits several shells launching runs at once.
+JOURNAL_MODES = ("delete", "wal")
+DEFAULT_JOURNAL_MODE = "delete"
+DEFAULT_BUSY_TIMEOUT = 5.0
+WRITE_RETRIES = 8
+MMAP_SIZE = 2 ** 28
+# sets of more literal paths than this are joined through a temporary table
+TEMP_TABLE_THRESHOLD = 100
+# patterns per compound SELECT, well below SQLite's limit of 500 terms
+COMPOUND_SELECT_TERMS = 200
+# number of rows fetched from the cursor at a time when streaming results
+FETCH_SIZE = 1000
+# `datetime` is stored as microseconds since the epoch and read in isoformat, the
+# way `datetime.isoformat` writes naive times
+ISOFORMAT = """
+strftime('%Y-%m-%dT%H:%M:%S', "datetime" / 1000000, 'unixepoch')
+|| CASE WHEN "datetime" % 1000000 THEN printf('.%06d', "datetime" % 1000000) ELSE '' END
+"""
+
+
+def numeric(value: Optional[str]) -> Optional[float]:
+    try:
+        number = float(value)
+    except (TypeError, ValueError):
+        return None
+    return number if math.isfinite(number) else None
+
+
+def parameters_tuple(parameters: Iterable) -> tuple:
+    """
+    :return: `parameters` as SQLite binds them, with paths converted to text
+    """
+    return tuple(str(p) if isinstance(p, PurePath) else p for p in parameters)
+
+
+def command_args(command: str) -> str:
+    """
+    SQLite function used by the `run_args` triggers.
+
+    :return: a JSON list of [position, key, value, numeric_value] for each argument
+    of `command`
+    """
+    rows = []
+    for position, (key, value) in enumerate(command_parse(command).key_values()):
+        rows.append([position, key, value, numeric(value)])
+    return json.dumps(rows)
+
+
+def command_arg(command: str, name: str) -> Optional[str]:
+    """
+    SQLite function `arg(command, name)`: the value of argument `name` in `command`
+    """
+    return command_parse(command).arg(name)
+
+
+def command_arg_num(command: str, name: str) -> Optional[float]:
+    """
+    SQLite function `arg_num(command, name)`: the value of argument `name` in
+    `command` if it is a number
+    """
+    return numeric(command_parse(command).arg(name))
+
+
+def command_has_flag(command: str, name: str) -> bool:
+    """
+    SQLite function `has_flag(command, name)`: whether `command` has flag `name`
+    """
+    return command_parse(command).has_flag(name)
+
+
+def path_id(path: str) -> int:
+    """
+    SQLite function used by the `runs_search` triggers.
+
+    :return: a 64-bit integer hash of `path`, which serves as its rowid
+    """
+    digest = hashlib.blake2b(path.encode(), digest_size=8).digest()
+    return int.from_bytes(digest, "big", signed=True)
+
+
+# SQLite functions registered on every connection, by name: (number of arguments,
+# function). All are pure functions of their arguments.
+FUNCTIONS = dict(
+    command_args=(1, command_args),
+    path_id=(1, path_id),
+    arg=(2, command_arg),
+    arg_num=(2, command_arg_num),
+    has_flag=(2, command_has_flag),
+)
 
 
 class DataBase:
     def pattern_match(*patterns: str):
-        return query.Any(*[Like("path", pattern) for pattern in patterns])
+        return query.Any(*[query.like("path", pattern) for pattern in patterns])
 
     @staticmethod
-    def open(func):
+    def open(func, read_only: bool = True):
         @wraps(func)
-        def open_wrapper(db_path, quiet, *args, **kwargs):
+        def open_wrapper(
+            db_path,
+            quiet,
+            *args,
+            journal_mode=DEFAULT_JOURNAL_MODE,
+            busy_timeout=DEFAULT_BUSY_TIMEOUT,
+            **kwargs,
+        ):
             logger = Logger(quiet=quiet)
-            with DataBase(db_path, logger) as db:
+            with DataBase(
+                db_path,
+                logger,
+                journal_mode=journal_mode,
+                busy_timeout=busy_timeout,
+                read_only=read_only,
+            ) as db:
                 return func(*args, **kwargs, logger=logger, db=db)
 
         return open_wrapper
 
     @staticmethod
-    def query(func):
+    def open_writable(func):
+        """
+        Like `open`, for subcommands that only query runs but write caches such as
+        `run_metrics`.
+        """
+        return DataBase.open(func, read_only=False)
+
+    @staticmethod
+    def query(func, stream: bool = False, columns=None, select: bool = True):
         @wraps(func)
         def query_wrapper(
             logger: Logger,
@@ -46,6 +182,10 @@ class DataBase:
             since: datetime,
             last: timedelta,
             order: str = None,
+            case_sensitive: bool = False,
+            from_file: Path = None,
+            where: Condition = None,
+            explain: bool = False,
             *args,
             **kwargs,
         ):
@@ -55,49 +195,145 @@ class DataBase:
                 order=order,
                 descendants=descendants,
                 active=active,
+                case_sensitive=case_sensitive,
+                from_file=from_file,
+                where=where,
             )
-            runs = db.get(
+            condition = db.condition(
                 patterns=patterns,
                 unless=unless,
-                order=order,
                 descendants=descendants,
                 active=active,
                 since=since,
                 last=last,
+                case_sensitive=case_sensitive,
+                from_file=from_file,
+                where=where,
             )
+            if explain:
+                if not select:
+                    # the subcommand runs its own statements over `condition`
+                    logger.exit(
+                        "--explain is only supported by subcommands that list runs."
+                    )
+                logger.print(*db.explain(condition=condition, order=order), sep="\n")
+                return
+            if select:
+                if callable(columns):
+                    runs = db.where(condition, order, columns(*args, **kwargs))
+                else:
+                    runs = db.where(condition, order, columns)
+                kwargs.update(runs=runs if stream else list(runs))
             return func(
-                *args, **kwargs, logger=logger, runs=runs, db=db, query_args=query_args
+                *args,
+                **kwargs,
+                logger=logger,
+                db=db,
+                query_args=query_args,
+                condition=condition,
             )
 
         return query_wrapper
 
-    def __init__(self, path, logger: Logger):
+    @staticmethod
+    def query_stream(func):
+        """
+        Like `query`, but `runs` is an iterator that reads rows from the cursor as it
+        is consumed, so it can only be traversed once.
+        """
+        return DataBase.query(func, stream=True)
+
+    @staticmethod
+    def projected(columns: Union[List[str], Callable[..., List[str]]]):
+        """
+        Like `query_stream`, but each run only holds `columns` (and `path`). `columns`
+        may also be a function of the subcommand's arguments that returns them.
+        """
+        return lambda func: DataBase.query(func, stream=True, columns=columns)
+
+    @staticmethod
+    def aggregate(func):
+        """
+        Like `query`, but selects no runs. The subcommand receives the `condition`
+        that matches them instead, to aggregate over in SQL.
+        """
+        return DataBase.query(func, select=False)
+
+    def __init__(
+        self,
+        path,
+        logger: Logger,
+        journal_mode: str = DEFAULT_JOURNAL_MODE,
+        busy_timeout: float = DEFAULT_BUSY_TIMEOUT,
+        read_only: bool = False,
+    ):
         self.logger = logger
         self.path = path
+        self.journal_mode = journal_mode
+        self.busy_timeout = busy_timeout
+        self.read_only = read_only
+        self.temp_tables = 0
         self.table_name = "runs"
         self.conn = None
         self.columns = set(RunEntry.fields())
         self.key = "path"
         self.fields = RunEntry.fields()
+        self.write_queue = None
 
     def __enter__(self):
         if not self.path.parent.exists():
             self.logger.exit(
                 f"parent directory of database does not exist: {self.path.parent}"
             )
-        self.conn = sqlite3.connect(str(self.path))
-        # noinspection PyUnresolvedReferences
-        fields = [f"'{f}' text NOT NULL" for f in self.fields]
-        fields[0] += " PRIMARY KEY"
-        self.conn.execute(
-            f"""
-        CREATE TABLE IF NOT EXISTS {self.table_name} ({', '.join(fields)})
-        """
-        )
+        if self.read_only and self.path.exists():
+            self.connect()
+            if migrations.version(self.conn) == len(migrations.MIGRATIONS):
+                # no DDL and no commit, since nothing is written
+                self.conn.execute("PRAGMA query_only=ON")
+                self.conn.execute(f"PRAGMA mmap_size={MMAP_SIZE}")
+                return self
+            # the schema must be migrated first
+            self.conn.close()
+        # a missing database is created and opened normally
+        self.read_only = False
+        if self.journal_mode not in JOURNAL_MODES:
+            self.logger.exit(
+                f"journal_mode must be one of the following values: {JOURNAL_MODES}"
+            )
+        self.connect()
+        if self.journal_mode == "wal":
+            # the journal mode persists in the database file
+            self.conn.execute("PRAGMA journal_mode=WAL")
+            self.conn.execute("PRAGMA synchronous=NORMAL")
+        try:
+            migrations.migrate(self.conn)
+        except (RuntimeError, sqlite3.Error) as e:
+            self.logger.exit(f"Could not migrate {self.path}: {e}")
         return self
 
+    def connect(self):
+        if self.read_only:
+            self.conn = sqlite3.connect(
+                Path(self.path).absolute().as_uri() + "?mode=ro",
+                uri=True,
+                timeout=self.busy_timeout,
+            )
+        else:
+            self.conn = sqlite3.connect(str(self.path), timeout=self.busy_timeout)
+        # needed by any connection that reads or writes the natural-order index
+        self.conn.create_collation("NATURAL", natural_compare)
+        for name, (num_params, function) in FUNCTIONS.items():
+            try:
+                self.conn.create_function(
+                    name, num_params, function, deterministic=True
+                )
+            except (TypeError, sqlite3.NotSupportedError):
+                # `deterministic` needs Python 3.8 and SQLite 3.8.3
+                self.conn.create_function(name, num_params, function)
+
     def __exit__(self, exc_type, exc_val, exc_tb):
-        self.conn.commit()
+        if not self.read_only:
+            self.conn.commit()
         self.conn.close()
 
     def check_field(self, field: str):
@@ -106,53 +342,87 @@ class DataBase:
                 f"{field} must be one of the following values: {self.fields}"
             )
 
-    def select(
+    def select_sql(
         self,
         columns: Iterable[str] = None,
         condition: Condition = None,
         unless: Condition = None,
         order: str = None,
-    ) -> sqlite3.Cursor:
+    ):
         if columns is None:
-            columns = ["*"]
-        select = f"""
-        SELECT {','.join(columns)} FROM {self.table_name}
+            columns = self.fields
+        for column in columns:
+            self.check_field(column)
+        if unless:
+            condition = query.And(condition, query.Not(unless))
+        sql = f"""
+        SELECT {','.join(map(self.column_sql, columns))} FROM {self.table_name}
         """
-        sql = select
         values = []
-
-        def check():
-            assert sql.count("?") == len(values)
-
         if condition:
-            sql += f"WHERE {condition}"
-            values += condition.values()
-            check()
-        if unless:
-            sql += f" EXCEPT {select} WHERE {unless}"
-            values += unless.values()
-            check()
+            compiled = condition.compile()
+            sql += f"WHERE {compiled.sql}"
+            values += compiled.params
         if order:
             self.check_field(order)
-            sql += f' ORDER BY "{order}"'
-        check()
-        return self.execute(sql, values)
+            sql += f' ORDER BY {self.table_name}."{order}"'
+            if order == self.key:
+                sql += ' COLLATE "NATURAL"'
+        assert sql.count("?") == len(values)
+        return sql, values
+
+    @staticmethod
+    def column_sql(column: str) -> str:
+        if column == "datetime":
+            return f'{ISOFORMAT} AS "datetime"'
+        return f'"{column}"'
 
-    def get(
+    def select(
+        self,
+        columns: Iterable[str] = None,
+        condition: Condition = None,
+        unless: Condition = None,
+        order: str = None,
+    ) -> sqlite3.Cursor:
+        return self.execute(
+            *self.select_sql(
+                columns=columns, condition=condition, unless=unless, order=order
+            )
+        )
+
+    def condition(
         self,
         patterns: Iterable[PurePath],
         unless: Iterable[PurePath] = None,
-        order: bool = None,
         descendants: bool = False,
         active: bool = False,
         since: datetime = None,
         last: timedelta = None,
-    ) -> List[RunEntry]:
-
+        case_sensitive: bool = False,
+        from_file: Path = None,
+        where: Condition = None,
+    ) -> Condition:
+        patterns = list(map(str, patterns))
         if descendants:
-            patterns = list(map(str, patterns))
-            patterns += [f'{str(pattern).rstrip("/%")}/%' for pattern in patterns]
-        condition = DataBase.pattern_match(*patterns)
+            patterns += [f'{pattern.rstrip("/%")}/%' for pattern in patterns]
+        # paths listed in a file are exact, not patterns
+        file_paths = []
+        if from_file is not None:
+            with Path(from_file).open() as f:
+                file_paths = [line.strip() for line in f if line.strip()]
+        literals = [p for p in patterns if query.is_literal(p)]
+        if len(literals) > TEMP_TABLE_THRESHOLD:
+            patterns = [p for p in patterns if not query.is_literal(p)]
+            # NOCASE compares like LIKE does without wildcards
+            collation = None if case_sensitive else "NOCASE"
+            literals = query.InTable("path", self.temp_table(literals), collation)
+        else:
+            literals = query.Any()
+        condition = query.Any(
+            literals,
+            DataBase.pattern_match(*patterns),
+            self.membership("path", file_paths),
+        )
         if since or last:
             if since:
                 time = since
@@ -160,67 +430,412 @@ class DataBase:
                 time = datetime.now() - last
             if since and last:
                 time = max(datetime.now() - last, since)
-            condition = condition & GreaterThan("datetime", time)
+            condition = condition & GreaterThan("datetime", epoch_microseconds(time))
         if active:
-            condition = condition & In("path", *TMUXSession.active_runs(self.logger))
+            active_runs = self.temp_table(TMUXSession.active_runs(self.logger))
+            condition = condition & query.InTable("path", active_runs)
         if unless:
-            unless = DataBase.pattern_match(*unless)
+            condition = condition & ~DataBase.pattern_match(*unless)
+        if where is not None:
+            condition = condition & where
+        return query.plan(condition, case_sensitive=case_sensitive)
+
+    def stream(
+        self,
+        patterns: Iterable[PurePath],
+        unless: Iterable[PurePath] = None,
+        order: bool = None,
+        descendants: bool = False,
+        active: bool = False,
+        since: datetime = None,
+        last: timedelta = None,
+        case_sensitive: bool = False,
+        from_file: Path = None,
+        where: Condition = None,
+        columns: Iterable[str] = None,
+    ) -> Iterator[RunEntry]:
+        """
+        :param columns: if given, yield rows of `RunEntry.projection(columns)` that
+        only hold these columns, always starting with `path`.
+        """
+        condition = self.condition(
+            patterns=patterns,
+            unless=unless,
+            descendants=descendants,
+            active=active,
+            since=since,
+            last=last,
+            case_sensitive=case_sensitive,
+            from_file=from_file,
+            where=where,
+        )
+        return self.where(condition, order=order, columns=columns)
+
+    def where(
+        self, condition: Condition, order: str = None, columns: Iterable[str] = None
+    ) -> Iterator[RunEntry]:
+        """
+        Same as `stream`, for a condition built by `DataBase.condition`.
+        """
+        if columns is not None:
+            columns = [self.key] + [c for c in columns if c != self.key]
+        cursor = self.select(columns=columns, condition=condition, order=order)
+        return DataBase.entries(cursor, columns=columns)
 
-        return [
-            RunEntry(PurePath(p), *e)
-            for (p, *e) in self.select(
-                condition=condition, unless=unless, order=order
-            ).fetchall()
-        ]
+    def get(self, *args, **kwargs) -> List[RunEntry]:
+        """
+        Same arguments as `stream`, but reads all matching entries at once.
+        """
+        return list(self.stream(*args, **kwargs))
+
+    @staticmethod
+    def entries(
+        cursor: sqlite3.Cursor, columns: Iterable[str] = None
+    ) -> Iterator[RunEntry]:
+        row_type = RunEntry if columns is None else RunEntry.projection(*columns)
+        while True:
+            rows = cursor.fetchmany(FETCH_SIZE)
+            if not rows:
+                return
+            for path, *row in rows:
+                yield row_type(PurePath(path), *row)
+
+    def explain(self, condition: Condition, order: str = None) -> List[str]:
+        """
+        :return: the SQL that `where` would run with these arguments, its parameters
+        and SQLite's plan for it.
+        """
+        sql, values = self.select_sql(condition=condition, order=order)
+        plan = self.execute(f"EXPLAIN QUERY PLAN {sql}", values).fetchall()
+        depths = {0: -1}
+        lines = [" ".join(sql.split()), f"parameters: {values}", "query plan:"]
+        for node_id, parent_id, _, detail in plan:
+            depths[node_id] = depths.get(parent_id, -1) + 1
+            lines.append("  " * (depths[node_id] + 1) + detail)
+        return lines
+
+    def matching_paths(self, condition: Condition) -> Compiled:
+        """
+        :return: a subquery for the paths of the runs that match `condition`
+        """
+        sql, values = self.select_sql(columns=[self.key], condition=condition)
+        return Compiled(sql=f"path IN ({sql})", params=tuple(values))
+
+    def arg_values(self, condition: Condition) -> Iterator[Tuple[str, str]]:
+        """
+        :return: each distinct (key, value) of an optional argument in the commands
+        of the runs that match `condition`
+        """
+        paths = self.matching_paths(condition)
+        return self.execute(
+            f"""
+        SELECT key, value FROM {ARGS_TABLE}
+        WHERE key IS NOT NULL AND value IS NOT NULL AND {paths.sql}
+        GROUP BY key, value
+        """,
+            paths.params,
+        )
+
+    def keyword_args(self, condition: Condition) -> sqlite3.Cursor:
+        """
+        :return: a cursor over (path, key, value, numeric_value) for each flag and
+        optional argument in the commands of the runs that match `condition`. Flags
+        have no value.
+        """
+        paths = self.matching_paths(condition)
+        return self.execute(
+            f"""
+        SELECT path, key, value, numeric_value FROM {ARGS_TABLE}
+        WHERE key IS NOT NULL AND {paths.sql}
+        """,
+            paths.params,
+        )
+
+    def arg_lists(self, condition: Condition, kind: str) -> Iterator[Tuple[str, ...]]:
+        """
+        :param kind: "positionals" or "flags"
+        :return: each distinct sequence of positional arguments or of flags in the
+        commands of the runs that match `condition`
+        """
+        column, where = dict(positionals=("value", "key"), flags=("key", "value"))[kind]
+        sql, values = self.select_sql(columns=[self.key], condition=condition)
+        # arguments never contain whitespace, since `Command` splits on it
+        cursor = self.execute(
+            f"""
+        SELECT DISTINCT (
+            SELECT group_concat({column}, ' ') FROM (
+                SELECT {column} FROM {ARGS_TABLE} AS args
+                WHERE args.path = runs.path AND args.{where} IS NULL
+                ORDER BY position
+            )
+        ) FROM ({sql}) AS runs
+        """,
+            values,
+        )
+        for args, in cursor:
+            yield tuple(args.split(" ")) if args else ()
+
+    def search(
+        self,
+        text: str,
+        condition: Condition = None,
+        limit: int = None,
+        start: str = "[",
+        end: str = "]",
+    ) -> sqlite3.Cursor:
+        """
+        Full-text search of the descriptions and commands of the runs that match
+        `condition`, using FTS5's query syntax.
+
+        :return: a cursor over (path, snippet, rank) for each matching run, best
+        match first. Matching terms in the snippet are wrapped in `start` and `end`.
+        """
+        sql = f"""
+        SELECT path, snippet({SEARCH_TABLE}, -1, ?, ?, '...', 16), rank
+        FROM {SEARCH_TABLE} WHERE {SEARCH_TABLE} MATCH ?
+        """
+        values = [start, end, text]
+        if condition:
+            paths = self.matching_paths(condition)
+            sql += f"AND {paths.sql} "
+            values += paths.params
+        # rank is bm25(), for which lower is better
+        sql += "ORDER BY rank"
+        if limit is not None:
+            sql += " LIMIT ?"
+            values.append(limit)
+        return self.execute(sql, values)
+
+    def metric_rows(self, metric_name: str) -> Dict[str, tuple]:
+        """
+        :return: (value, source_file, mtime, size) of each run with a cached value of
+        `metric_name`, by path
+        """
+        cursor = self.execute(
+            f"""
+        SELECT path, value, source_file, mtime, size FROM {METRICS_TABLE}
+        WHERE metric_name = ?
+        """,
+            [metric_name],
+        )
+        # non-finite values are stored as text by `put_metric`
+        return {
+            path: (float(value) if isinstance(value, str) else value, *row)
+            for path, value, *row in cursor
+        }
+
+    def put_metric(
+        self,
+        path: PathLike,
+        metric_name: str,
+        value: Optional[float],
+        source_file: PathLike,
+        mtime: int,
+        size: int,
+    ):
+        if value is not None and not math.isfinite(value):
+            # SQLite stores NaN as NULL, which marks a file that could not be read
+            value = str(value)
+        self.write(
+            f"""
+        INSERT OR REPLACE INTO {METRICS_TABLE}
+        (path, metric_name, value, source_file, mtime, size)
+        VALUES (?, ?, ?, ?, ?, ?)
+        """,
+            [path, metric_name, value, source_file, mtime, size],
+        )
+
+    def delete_metric(self, path: PathLike, metric_name: str):
+        self.write(
+            f"DELETE FROM {METRICS_TABLE} WHERE metric_name = ? AND path = ?",
+            [metric_name, path],
+        )
+
+    def paths_with_configs(self, config_hashes: Iterable[str]) -> Dict[str, str]:
+        """
+        :return: for each of `config_hashes` that some run has, the path of such a run
+        """
+        condition = self.membership("config_hash", list(config_hashes))
+        if not condition:
+            return {}
+        sql, values = self.select_sql(
+            columns=["config_hash", self.key], condition=condition
+        )
+        return dict(self.execute(sql, values))
 
     def __getitem__(self, patterns) -> List[RunEntry]:
         if not isinstance(patterns, Iterable):
             patterns = [patterns]
         return self.get(patterns)
 
+    def temp_table(self, values: Iterable[PathLike]) -> str:
+        """
+        Bulk-load `values` into a new TEMP table with a single `value` column.
+
+        :return: the name of the table, for use with `query.InTable`
+        """
+        self.temp_tables += 1
+        name = f"temp.values_{self.temp_tables}"
+        if self.read_only:
+            # TEMP tables live outside the database file, which stays read-only
+            self.conn.execute("PRAGMA query_only=OFF")
+        try:
+            self.conn.execute(f"CREATE TABLE {name} (value text PRIMARY KEY)")
+            self.conn.executemany(
+                f"INSERT OR IGNORE INTO {name} VALUES (?)", ((str(v),) for v in values)
+            )
+        finally:
+            if self.read_only:
+                self.conn.execute("PRAGMA query_only=ON")
+        return name
+
     def execute(self, sql: str, parameters: Iterable):
-        return self.conn.execute(sql, tuple(map(str, parameters)))
+        return self.conn.execute(sql, parameters_tuple(parameters))
 
-    def __contains__(self, *patterns: PathLike) -> bool:
-        return bool(self.select(condition=DataBase.pattern_match(*patterns)).fetchone())
+    def membership(self, column: str, values: List[str]) -> Condition:
+        """
+        :return: a condition that `column` is one of `values`, which loads large sets
+        of values into a temporary table
+        """
+        if len(values) > TEMP_TABLE_THRESHOLD:
+            return query.InTable(column, self.temp_table(values))
+        return In(column, *values)
 
-    def __delitem__(self, *patterns: PathLike):
-        self.execute(
-            f"DELETE FROM {self.table_name} WHERE {DataBase.pattern_match(*patterns)}",
-            patterns,
-        )
+    def existing_paths(self, paths: Iterable[PathLike]) -> Set[str]:
+        """
+        :return: the members of `paths` that are the exact path of some run, found
+        with one query through the index on `path`
+        """
+        paths = list(set(map(str, paths)))
+        if not paths:
+            return set()
+        condition = self.membership(self.key, paths)
+        return {path for path, in self.select(columns=[self.key], condition=condition)}
+
+    def existing(self, patterns: Iterable[PathLike]) -> Set[str]:
+        """
+        :return: the members of `patterns` that match the path of some run, found with
+        one query per `COMPOUND_SELECT_TERMS` patterns
+        """
+        patterns = list(set(map(str, patterns)))
+        found = set()
+        for start in range(0, len(patterns), COMPOUND_SELECT_TERMS):
+            selects, values = [], []
+            for pattern in patterns[start : start + COMPOUND_SELECT_TERMS]:
+                compiled = query.plan(query.like("path", pattern)).compile()
+                selects.append(
+                    f"SELECT ? WHERE EXISTS "
+                    f"(SELECT 1 FROM {self.table_name} WHERE {compiled.sql})"
+                )
+                values += [pattern, *compiled.params]
+            cursor = self.execute(" UNION ALL ".join(selects), values)
+            found.update(value for value, in cursor)
+        return found
+
+    def __contains__(self, pattern: PathLike) -> bool:
+        return bool(self.existing([pattern]))
+
+    @contextmanager
+    def batch(self):
+        """
+        Queue calls to `append`, `update_path` and `delete_path` and flush them on
+        exit with one `executemany` per statement, inside a single transaction. The
+        writes queued before an exception are flushed too, since they record work,
+        such as starting a run, that has already been done.
+        """
+        self.write_queue = []
+        try:
+            yield self
+        finally:
+            try:
+                self.flush()
+            finally:
+                self.write_queue = None
+
+    def flush(self):
+        queue, self.write_queue = self.write_queue, []
+        if not queue:
+            return
+
+        def write_transaction():
+            if self.conn.in_transaction:
+                self.conn.commit()
+            # take the write lock up front so that the transaction cannot fail
+            # halfway through on a lock held by another process
+            self.conn.execute("BEGIN IMMEDIATE")
+            try:
+                for sql, parameters in queue:
+                    self.conn.executemany(sql, parameters)
+            except BaseException:
+                self.conn.rollback()
+                raise
+            self.conn.commit()
+
+        self.retry(write_transaction)
+
+    def retry(self, func):
+        """
+        Call `func`, retrying with jittered exponential backoff while another
+        connection holds the lock for longer than `busy_timeout`.
+        """
+        for attempt in range(WRITE_RETRIES):
+            try:
+                return func()
+            except sqlite3.OperationalError as e:
+                if not ("locked" in str(e) or "busy" in str(e)):
+                    raise
+                if attempt == WRITE_RETRIES - 1:
+                    self.logger.exit(f"Gave up waiting for {self.path}: {e}")
+                time.sleep(random.uniform(0, 0.05 * 2 ** attempt))
+
+    def write(self, sql: str, parameters: Iterable):
+        parameters = parameters_tuple(parameters)
+        if self.write_queue is None:
+            return self.conn.execute(sql, parameters)
+        # consecutive writes with the same statement share an executemany call,
+        # so the original order of statements is preserved
+        if self.write_queue and self.write_queue[-1][0] == sql:
+            self.write_queue[-1][1].append(parameters)
+        else:
+            self.write_queue.append((sql, [parameters]))
 
     def append(self, run: RunEntry):
+        run = run.replace(
+            command=str(run.command),
+            datetime=epoch_microseconds(parse_isoformat(run.datetime)),
+        )
         placeholders = ",".join("?" * len(run))
-        self.execute(
+        self.write(
             f"""
         INSERT INTO {self.table_name} ({self.fields}) VALUES ({placeholders})
         """,
             run,
         )
 
-    def all(self, unless: Condition = None, order: str = None):
-        self.check_field(order)
-        return [
-            RunEntry(*e) for e in self.select(unless=unless, order=order).fetchall()
-        ]
-
-    def all_paths(self):
-        return self.select(columns=["path"])
+    def delete_path(self, path: PathLike):
+        self.write(f"DELETE FROM {self.table_name} WHERE {self.key} = ?", [path])
 
-    def update(self, *patterns: PathLike, **kwargs):
-        update_placeholders = ",".join([f"{k} = ?" for k in kwargs])
-        condition = query.Any(*[Like(self.key, p) for p in patterns])
-        self.execute(
+    def update_path(self, target: PathLike, **kwargs):
+        update_placeholders = ",".join([f'"{k}" = ?' for k in kwargs])
+        self.write(
             f"""
-        UPDATE {self.table_name} SET {update_placeholders} WHERE {condition}
+        UPDATE {self.table_name} SET {update_placeholders} WHERE {self.key} = ?
         """,
-            list(kwargs.values()) + condition.values(),
+            list(kwargs.values()) + [target],
         )
 
+    def all(self, unless: Condition = None, order: str = None):
+        self.check_field(order)
+        return list(DataBase.entries(self.select(unless=unless, order=order)))
+
     def delete(self):
         self.conn.execute(
             f"""
         DROP TABLE IF EXISTS {self.table_name}
         """
         )
+        self.conn.execute(f"DROP TABLE IF EXISTS {ARGS_TABLE}")
+        self.conn.execute(f"DROP TABLE IF EXISTS {SEARCH_TABLE}")
+        self.conn.execute(f"DROP TABLE IF EXISTS {METRICS_TABLE}")
+        # so that the next connection creates the schema again
+        self.conn.execute("PRAGMA user_version = 0")
@@ -11,10 +11,13 @@ import sys
 from typing import List
 
 # first party
+from runs.database import DEFAULT_BUSY_TIMEOUT, DEFAULT_JOURNAL_MODE
 from runs.logger import UI
 from runs.subcommands import (
+    args as args_subcommand,
     change_description,
     correlate,
+    dedup,
     diff,
     from_json,
     kill,
@@ -24,6 +27,7 @@ from runs.subcommands import (
     new,
     reproduce,
     rm,
+    search,
     to_json,
 )
 from runs.util import ARGS, MAIN
@@ -119,6 +123,8 @@ def main(argv=sys.argv[1:]):
         db_path=config[MAIN].get_path("db_path"),
         dir_names=config[MAIN].get_pure_path_list("dir_names"),
         args=config[MAIN].get_arg_list(ARGS),
+        journal_mode=config[MAIN].get("journal_mode", DEFAULT_JOURNAL_MODE),
+        busy_timeout=config[MAIN].getfloat("busy_timeout", DEFAULT_BUSY_TIMEOUT),
     )
 
     for subparser in [parser] + [
@@ -133,9 +139,12 @@ def main(argv=sys.argv[1:]):
             change_description.add_subparser,
             reproduce.add_subparser,
             correlate.add_subparser,
+            dedup.add_subparser,
             kill.add_subparser,
             diff.add_subparser,
             to_json.add_subparser,
+            args_subcommand.add_subparser,
+            search.add_subparser,
         ]
     ]:
         assert isinstance(subparser, argparse.ArgumentParser)
@@ -0,0 +1,217 @@
+"""
+Values of metrics that runs write to files, for example a final score. Values are
+cached in the `run_metrics` table with the size and modification time of their file,
+so that a file is only read again once it changes.
+
+A reader turns a file into a value. Readers are named by specs such as "scalar",
+"json:metrics.accuracy", "csv-max:accuracy" or "tb-last:eval/accuracy"; see
+`READERS`. TensorBoard readers also take a directory, whose event files they read
+in order, and which counts as changed when any file in it does.
+"""
+
+# stdlib
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+import csv
+import json
+from pathlib import Path
+import stat
+from typing import Callable, Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+# first party
+from runs import tensorboard
+from runs.database import DataBase
+from runs.util import PurePath
+
+Reader = Callable[[Path], float]
+# files are stat'ed and read in parallel, since they may be on high-latency storage
+DEFAULT_WORKERS = 16
+
+
+def read_scalar(path: Path) -> float:
+    with path.open() as f:
+        return float(f.read())
+
+
+def json_reader(key_path: str) -> Reader:
+    """
+    :param key_path: keys and list indices separated by dots, e.g. "eval.0.score"
+    """
+    keys = key_path.split(".") if key_path else []
+
+    def read(path: Path) -> float:
+        with path.open() as f:
+            value = json.load(f)
+        try:
+            for key in keys:
+                value = value[int(key) if isinstance(value, list) else key]
+            return float(value)
+        except (KeyError, IndexError, TypeError, ValueError):
+            raise ValueError(f"no number at {key_path} in JSON")
+
+    return read
+
+
+def csv_reader(column: str, aggregate: Callable[[List[float]], float]) -> Reader:
+    """
+    :return: a reader of `aggregate` over the non-empty cells of `column` in a CSV
+    file with a header row
+    """
+
+    def read(path: Path) -> float:
+        with path.open(newline="") as f:
+            rows = csv.DictReader(f)
+            if column not in (rows.fieldnames or []):
+                raise ValueError(f"no column {column} in CSV")
+            values = [float(row[column]) for row in rows if row[column]]
+        if not values:
+            raise ValueError(f"column {column} is empty")
+        return aggregate(values)
+
+    return read
+
+
+def tensorboard_reader(tag: str, aggregate: Callable[[List[float]], float]) -> Reader:
+    """
+    :return: a reader of `aggregate` over the scalars tagged `tag` in a TensorBoard
+    event file, or in the event files in a directory
+    """
+
+    def read(path: Path) -> float:
+        values = [value for _, value in tensorboard.scalars(path, tag)]
+        if not values:
+            raise ValueError(f"no scalars tagged {tag}")
+        return aggregate(values)
+
+    return read
+
+
+# reader spec name: function of the text after the colon that returns the reader
+READERS = {
+    "scalar": lambda _: read_scalar,
+    "json": json_reader,
+    "csv-last": lambda column: csv_reader(column, lambda values: values[-1]),
+    "csv-min": lambda column: csv_reader(column, min),
+    "csv-max": lambda column: csv_reader(column, max),
+    "tb-last": lambda tag: tensorboard_reader(tag, lambda values: values[-1]),
+    "tb-min": lambda tag: tensorboard_reader(tag, min),
+    "tb-max": lambda tag: tensorboard_reader(tag, max),
+}
+
+
+def reader(spec: str) -> Reader:
+    """
+    :raise ValueError: if `spec` does not name a reader
+    """
+    name, _, argument = spec.partition(":")
+    if name not in READERS:
+        raise ValueError(
+            f"{spec} is not a reader. Readers are {', '.join(READERS)}, followed by "
+            f"a colon and an argument where needed."
+        )
+    return READERS[name](argument)
+
+
+def source_file(value_path: PurePath, path: PurePath) -> Path:
+    """
+    :return: `value_path` for the run at `path`, which replaces the keyword <path>
+    """
+    return Path(str(value_path).replace("<path>", str(path)).replace("\\", ""))
+
+
+def signature(file: Path) -> Tuple[int, int]:
+    """
+    :return: the modification time and size of `file`, or if it is a directory, the
+    latest modification time and the total size of it and the files under it
+    """
+    file_stat = file.stat()
+    if not stat.S_ISDIR(file_stat.st_mode):
+        return file_stat.st_mtime_ns, file_stat.st_size
+    stats = [file_stat] + [f.stat() for f in file.rglob("*")]
+    return max(s.st_mtime_ns for s in stats), sum(s.st_size for s in stats)
+
+
+class Loaded(NamedTuple):
+    file: Path
+    value: Optional[float]
+    error: Optional[str]
+    # source file, mtime and size, if the file exists
+    key: Optional[tuple]
+    cached: bool = False
+
+
+def os_error(e: OSError) -> str:
+    return (e.strerror or str(e)).lower()
+
+
+def metric_values(
+    db: DataBase,
+    paths: Iterable[PurePath],
+    value_path: PurePath,
+    reader_spec: str = "scalar",
+    workers: int = DEFAULT_WORKERS,
+) -> Tuple[Dict[PurePath, float], Dict[Path, str]]:
+    """
+    Read the value of a metric for each run, from the file at `value_path`. Only
+    files whose size or modification time differ from the cached ones are read.
+
+    :return: the value of each run that has one, by path, and the reason for each
+    file that could not be read
+    """
+    paths = list(paths)
+    metric_name = f"{reader_spec} {value_path}"
+    read = reader(reader_spec)
+    cached = db.metric_rows(metric_name)
+
+    def load(path: PurePath) -> Loaded:
+        file = source_file(value_path, path)
+        try:
+            key = (str(file), *signature(file))
+        except OSError as e:
+            return Loaded(file, value=None, error=os_error(e), key=None)
+        row = cached.get(str(path))
+        if row is not None and row[1:] == key:
+            value, *_ = row
+            error = "could not be read" if value is None else None
+            return Loaded(file, value=value, error=error, key=key, cached=True)
+        value, error = read_value(read, file)
+        return Loaded(file, value=value, error=error, key=key)
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        loaded = list(pool.map(load, paths))
+    values = {}
+    errors = {}
+    # the connection may only be used from this thread
+    with db.batch():
+        for path, (file, value, error, key, was_cached) in zip(paths, loaded):
+            if key is None and str(path) in cached:
+                db.delete_metric(path, metric_name)
+            elif key is not None and not was_cached:
+                db.put_metric(path, metric_name, value, *key)
+            if value is None:
+                errors[file] = error
+            else:
+                values[path] = value
+    return values, errors
+
+
+def read_value(read: Reader, file: Path) -> Tuple[Optional[float], Optional[str]]:
+    try:
+        return float(read(file)), None
+    except OSError as e:
+        return None, os_error(e)
+    except ValueError as e:
+        return None, str(e)
+
+
+def error_summary(errors: Dict[Path, str], examples: int = 3) -> List[str]:
+    """
+    :return: a line for each reason why files could not be read, with the number of
+    such files and a few of them
+    """
+    lines = []
+    for reason, count in Counter(errors.values()).most_common():
+        files = [str(f) for f, r in errors.items() if r == reason][:examples]
+        more = ", ..." if count > examples else ""
+        lines.append(f"{count} file(s) {reason}: {', '.join(files)}{more}")
+    return lines
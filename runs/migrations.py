@@ -0,0 +1,310 @@
+"""
+Changes to the schema of the database, applied in order when it is opened.
+`PRAGMA user_version` counts the migrations that have been applied. Each one runs in
+its own transaction together with the update of `user_version`, and is written so
+that it can also run over a schema that it has partly changed already. Migrations
+that have been released must not change, since databases already record them.
+"""
+
+# stdlib
+import sqlite3
+from typing import Callable, List
+
+Migration = Callable[[sqlite3.Connection], None]
+MIGRATIONS: List[Migration] = []
+
+
+def migration(func: Migration) -> Migration:
+    MIGRATIONS.append(func)
+    return func
+
+
+def version(conn: sqlite3.Connection) -> int:
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+
+def execute_all(conn: sqlite3.Connection, *statements: str):
+    # unlike `executescript`, this does not commit
+    for statement in statements:
+        conn.execute(statement)
+
+
+def migrate(conn: sqlite3.Connection):
+    """
+    Apply the migrations that `conn`'s database has not recorded.
+
+    :raise RuntimeError: if the database was migrated by a newer version
+    """
+    if version(conn) > len(MIGRATIONS):
+        raise RuntimeError(
+            f"the database has schema version {version(conn)}, but this version "
+            f"of runs only knows {len(MIGRATIONS)}"
+        )
+    for number, func in enumerate(MIGRATIONS, start=1):
+        if version(conn) >= number:
+            continue
+        if conn.in_transaction:
+            conn.commit()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            # another process may have migrated while this one waited for the lock
+            if version(conn) < number:
+                func(conn)
+                conn.execute(f"PRAGMA user_version = {number}")
+        except BaseException:
+            conn.rollback()
+            raise
+        conn.commit()
+
+
+def args_triggers() -> List[str]:
+    def insert_args(run: str, source: str = "") -> str:
+        return f"""
+        INSERT INTO run_args (path, position, key, value, numeric_value)
+        SELECT {run}.path,
+               json_extract(arg.value, '$[0]'),
+               json_extract(arg.value, '$[1]'),
+               json_extract(arg.value, '$[2]'),
+               json_extract(arg.value, '$[3]')
+        FROM {source}json_each(command_args({run}.command)) AS arg
+        """
+
+    return [
+        f"""
+        CREATE TRIGGER IF NOT EXISTS run_args_insert AFTER INSERT ON runs
+        BEGIN {insert_args("NEW")}; END
+        """,
+        f"""
+        CREATE TRIGGER IF NOT EXISTS run_args_update_command
+        AFTER UPDATE OF command ON runs
+        BEGIN
+            DELETE FROM run_args WHERE path = OLD.path;
+            {insert_args("NEW")};
+        END
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS run_args_update_path AFTER UPDATE OF path ON runs
+        BEGIN
+            UPDATE run_args SET path = NEW.path WHERE path = OLD.path;
+        END
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS run_args_delete AFTER DELETE ON runs
+        BEGIN
+            DELETE FROM run_args WHERE path = OLD.path;
+        END
+        """,
+        # backfill, which only matters if the table is new
+        insert_args("runs", source="runs, ")
+        + "WHERE NOT EXISTS (SELECT 1 FROM run_args WHERE run_args.path = runs.path)",
+    ]
+
+
+def search_triggers() -> List[str]:
+    columns = "rowid, path, description, command"
+
+    def values(run: str) -> str:
+        return f"path_id({run}.path), {run}.path, {run}.description, {run}.command"
+
+    return [
+        f"""
+        CREATE TRIGGER IF NOT EXISTS runs_search_insert AFTER INSERT ON runs
+        BEGIN
+            INSERT INTO runs_search ({columns}) VALUES ({values("NEW")});
+        END
+        """,
+        f"""
+        CREATE TRIGGER IF NOT EXISTS runs_search_update
+        AFTER UPDATE OF path, description, command ON runs
+        BEGIN
+            DELETE FROM runs_search WHERE rowid = path_id(OLD.path);
+            INSERT INTO runs_search ({columns}) VALUES ({values("NEW")});
+        END
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS runs_search_delete AFTER DELETE ON runs
+        BEGIN
+            DELETE FROM runs_search WHERE rowid = path_id(OLD.path);
+        END
+        """,
+        # backfill, which only matters if the table is new
+        f"""
+        INSERT INTO runs_search ({columns})
+        SELECT {values("runs")} FROM runs
+        WHERE NOT EXISTS (SELECT 1 FROM runs_search WHERE rowid = path_id(runs.path))
+        """,
+    ]
+
+
+@migration
+def baseline(conn: sqlite3.Connection):
+    """
+    The schema before migrations, which databases created without them may have
+    in part.
+
+    `run_args` holds one row per argument of each run's command, parsed once by
+    `Command` when the run is inserted.
+
+    `runs_search` is an FTS5 index over the description and command of each run.
+    Its rowids are `path_id(path)` rather than the rowids of `runs`, which VACUUM
+    may renumber, so that triggers can find a run's row without a scan.
+    """
+    execute_all(
+        conn,
+        """
+        CREATE TABLE IF NOT EXISTS runs (
+            'path' text NOT NULL PRIMARY KEY,
+            'command' text NOT NULL,
+            'commit' text NOT NULL,
+            'datetime' text NOT NULL,
+            'description' text NOT NULL
+        )
+        """,
+        'CREATE INDEX IF NOT EXISTS runs_datetime ON runs ("datetime")',
+        'CREATE INDEX IF NOT EXISTS runs_commit ON runs ("commit")',
+        """
+        CREATE INDEX IF NOT EXISTS runs_path_natural
+        ON runs ("path" COLLATE "NATURAL")
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS run_args (
+            path text NOT NULL,
+            position integer NOT NULL,
+            key text,
+            value text,
+            numeric_value real,
+            PRIMARY KEY (path, position)
+        )
+        """,
+        "CREATE INDEX IF NOT EXISTS run_args_key_value ON run_args (key, value)",
+        """
+        CREATE INDEX IF NOT EXISTS run_args_key_numeric_value
+        ON run_args (key, numeric_value)
+        """,
+        *args_triggers(),
+        """
+        CREATE VIRTUAL TABLE IF NOT EXISTS runs_search
+        USING fts5(path UNINDEXED, description, command)
+        """,
+        *search_triggers(),
+    )
+
+
+# `datetime` in isoformat, as microseconds since the epoch
+EPOCH_MICROSECONDS = """
+CAST(strftime('%s', substr("datetime", 1, 19)) AS INTEGER) * 1000000
++ CASE WHEN substr("datetime", 20, 1) = '.'
+       THEN CAST(substr("datetime" || '000000', 21, 6) AS INTEGER)
+       ELSE 0 END
+"""
+
+
+@migration
+def epoch_datetime(conn: sqlite3.Connection):
+    """
+    Store `datetime` as an integer number of microseconds since the epoch instead
+    of in isoformat, so that it takes 8 bytes and compares as a number.
+    """
+    declared_type, = [
+        row[2] for row in conn.execute("PRAGMA table_info(runs)") if row[1] == "datetime"
+    ]
+    if declared_type.lower() == "integer":
+        return
+    if sqlite3.sqlite_version_info >= (3, 35, 0):
+        # rewrite the one column in place, so that the other indexes (the one in
+        # natural order in particular) need not be rebuilt
+        execute_all(
+            conn,
+            "DROP INDEX IF EXISTS runs_datetime",
+            "ALTER TABLE runs ADD COLUMN epoch integer NOT NULL DEFAULT 0",
+            f"UPDATE runs SET epoch = {EPOCH_MICROSECONDS}",
+            'ALTER TABLE runs DROP COLUMN "datetime"',
+            'ALTER TABLE runs RENAME COLUMN epoch TO "datetime"',
+            'CREATE INDEX runs_datetime ON runs ("datetime")',
+        )
+        return
+    # older versions of SQLite can only rebuild the table, which drops its indexes
+    # and triggers
+    execute_all(
+        conn,
+        """
+        CREATE TABLE runs_epoch (
+            'path' text NOT NULL PRIMARY KEY,
+            'command' text NOT NULL,
+            'commit' text NOT NULL,
+            'datetime' integer NOT NULL,
+            'description' text NOT NULL
+        )
+        """,
+        f"""
+        INSERT INTO runs_epoch
+        SELECT "path", "command", "commit", {EPOCH_MICROSECONDS}, "description"
+        FROM runs
+        """,
+        "DROP TABLE runs",
+        "ALTER TABLE runs_epoch RENAME TO runs",
+        'CREATE INDEX runs_datetime ON runs ("datetime")',
+        'CREATE INDEX runs_commit ON runs ("commit")',
+        'CREATE INDEX runs_path_natural ON runs ("path" COLLATE "NATURAL")',
+        *args_triggers(),
+        *search_triggers(),
+    )
+
+
+@migration
+def metrics_table(conn: sqlite3.Connection):
+    """
+    `run_metrics` caches values read from files in the runs' directories, together
+    with the size and modification time of the file they were read from.
+    """
+    execute_all(
+        conn,
+        """
+        CREATE TABLE IF NOT EXISTS run_metrics (
+            path text NOT NULL,
+            metric_name text NOT NULL,
+            value real,
+            source_file text NOT NULL,
+            mtime integer NOT NULL,
+            size integer NOT NULL,
+            PRIMARY KEY (metric_name, path)
+        )
+        """,
+        "CREATE INDEX IF NOT EXISTS run_metrics_path ON run_metrics (path)",
+        """
+        CREATE TRIGGER IF NOT EXISTS run_metrics_update_path
+        AFTER UPDATE OF path ON runs
+        BEGIN
+            UPDATE run_metrics SET path = NEW.path WHERE path = OLD.path;
+        END
+        """,
+        """
+        CREATE TRIGGER IF NOT EXISTS run_metrics_delete AFTER DELETE ON runs
+        BEGIN
+            DELETE FROM run_metrics WHERE path = OLD.path;
+        END
+        """,
+    )
+
+
+@migration
+def config_hash_column(conn: sqlite3.Connection):
+    """
+    `config_hash` identifies runs of the same commit with the same arguments. Runs
+    that were created before it existed have none.
+    """
+    columns = [row[1] for row in conn.execute("PRAGMA table_info(runs)")]
+    if "config_hash" not in columns:
+        conn.execute("ALTER TABLE runs ADD COLUMN config_hash text")
+    conn.execute("CREATE INDEX IF NOT EXISTS runs_config_hash ON runs (config_hash)")
+
+
+@migration
+def path_nocase_index(conn: sqlite3.Connection):
+    """
+    Patterns match case-insensitively unless `--case-sensitive` is given. SQLite
+    answers such LIKE patterns with an index that uses the NOCASE collation.
+    """
+    conn.execute(
+        "CREATE INDEX IF NOT EXISTS runs_path_nocase ON runs (path COLLATE NOCASE)"
+    )
@@ -0,0 +1,83 @@
+"""
+SQL LIKE patterns, matched in Python with the semantics of SQLite's LIKE operator:
+
+- `%` matches any sequence of characters, including none, and `_` matches any one
+  character,
+- unless `case_sensitive`, ASCII letters match either case, but other letters do
+  not, as with SQLite's default `PRAGMA case_sensitive_like=OFF`,
+- with an `escape` character, the character after it matches only itself, and a
+  pattern that ends with it matches nothing.
+
+Patterns are compiled once into an equality test, a prefix test or a regex.
+"""
+
+# stdlib
+from functools import lru_cache
+import re
+import string
+from typing import Callable, Optional
+
+WILDCARDS = "%_"
+ASCII_LOWER = str.maketrans(string.ascii_uppercase, string.ascii_lowercase)
+
+Matcher = Callable[[str], bool]
+
+
+def ascii_lower(value: str) -> str:
+    return value.translate(ASCII_LOWER)
+
+
+def tokens(pattern: str, escape: Optional[str]) -> Optional[list]:
+    """
+    :return: the wildcards of `pattern` as themselves and the runs of characters
+    between them as `(literal,)` tuples, or None if `pattern` ends with `escape`
+    """
+    result = []
+    literal = []
+    characters = iter(pattern)
+    for character in characters:
+        if character == escape:
+            character = next(characters, None)
+            if character is None:
+                return None
+            literal.append(character)
+        elif character in WILDCARDS:
+            if literal:
+                result.append(("".join(literal),))
+                literal = []
+            result.append(character)
+        else:
+            literal.append(character)
+    if literal:
+        result.append(("".join(literal),))
+    return result
+
+
+@lru_cache(maxsize=2 ** 12)
+def compile_like(
+    pattern: str, escape: Optional[str] = None, case_sensitive: bool = False
+) -> Matcher:
+    """
+    :return: a function of a string that returns whether it matches `pattern`
+    :raise ValueError: if `escape` is not a single character, which SQLite rejects
+    """
+    if escape is not None and len(escape) != 1:
+        raise ValueError("ESCAPE expression must be a single character")
+    parts = tokens(pattern, escape)
+    if parts is None:
+        return lambda value: False
+    fold = (lambda value: value) if case_sensitive else ascii_lower
+    if all(isinstance(part, tuple) for part in parts):
+        literal = fold("".join(part for part, in parts))
+        return lambda value: fold(value) == literal
+    *head, last = parts
+    if last == "%" and all(isinstance(part, tuple) for part in head):
+        prefix = fold("".join(part for part, in head))
+        return lambda value: fold(value).startswith(prefix)
+    regex = "".join(
+        {"%": ".*", "_": "."}[part] if isinstance(part, str) else re.escape(part[0])
+        for part in parts
+    )
+    flags = re.DOTALL if case_sensitive else re.DOTALL | re.IGNORECASE | re.ASCII
+    fullmatch = re.compile(regex, flags).fullmatch
+    return lambda value: fullmatch(value) is not None
@@ -1,8 +1,17 @@
 # stdlib
 from abc import abstractmethod
+from collections import namedtuple
+from functools import lru_cache
+import re
+from typing import List
+
+Compiled = namedtuple("Compiled", ["sql", "params"])
 
 
 class Condition:
+    _key = None
+    _compiled = None
+
     def __and__(self, condition):
         assert isinstance(condition, Condition)
         return And(self, condition)
@@ -15,36 +24,85 @@ class Condition:
         return Not(self)
 
     def __bool__(self):
-        return bool(self.values())
+        return self._nonempty()
 
     def __str__(self):
-        return f"({self._str()})" if self.values() else ""
+        return self.compile().sql
+
+    def __eq__(self, other):
+        return isinstance(other, Condition) and self.key() == other.key()
+
+    def __hash__(self):
+        return hash(self.key())
 
     def values(self):
-        return [str(v) for v in self._values() if v]
+        return list(self.compile().params)
+
+    def key(self) -> tuple:
+        """
+        Structural identity of the condition tree. Two trees with the same key
+        compile to the same SQL text and parameters.
+        """
+        if self._key is None:
+            self._key = (type(self).__name__, *self._key_parts())
+        return self._key
+
+    def compile(self) -> Compiled:
+        """
+        :return: the SQL text and the parameters of the condition tree, computed in
+        one pass over the tree and cached on the instance and by structure.
+        """
+        if self._compiled is None:
+            self._compiled = _compile(self)
+        return self._compiled
+
+    def emit(self, sql: List[str], params: List[str]):
+        if self._compiled is None:
+            self._emit(sql, params)
+        else:
+            sql.append(self._compiled.sql)
+            params.extend(self._compiled.params)
 
-    def _placeholders(self):
-        return ",".join("?" * len(self.values()))
+    @abstractmethod
+    def _nonempty(self) -> bool:
+        raise NotImplementedError
 
     @abstractmethod
-    def _str(self):
+    def _key_parts(self) -> tuple:
         raise NotImplementedError
 
     @abstractmethod
-    def _values(self):
+    def _emit(self, sql: List[str], params: List[str]):
         raise NotImplementedError
 
 
+@lru_cache(maxsize=256)
+def _compile(condition: Condition) -> Compiled:
+    sql = []
+    params = []
+    condition.emit(sql, params)
+    return Compiled(sql="".join(sql), params=tuple(params))
+
+
 class OneToManyPredicate(Condition):
     def __init__(self, column, *values):
         self.column = column
-        self.__values = values
+        self.__values = tuple(str(v) for v in values if v)
 
     def _values(self):
         return self.__values
 
-    def _str(self):
-        return f"{self.column} {self._keyword()} ({self._placeholders()})"
+    def _nonempty(self):
+        return bool(self.__values)
+
+    def _key_parts(self):
+        return (self.column, self.__values)
+
+    def _emit(self, sql, params):
+        if self.__values:
+            placeholders = ",".join("?" * len(self.__values))
+            sql.append(f"({self.column} {self._keyword()} ({placeholders}))")
+            params.extend(self.__values)
 
     @abstractmethod
     def _keyword(self):
@@ -56,6 +114,11 @@ class Like(OneToManyPredicate):
         return "LIKE"
 
 
+class Glob(OneToManyPredicate):
+    def _keyword(self):
+        return "GLOB"
+
+
 class In(OneToManyPredicate):
     def _keyword(self):
         return "IN"
@@ -81,17 +144,139 @@ class LessThan(OneToOnePredicate):
         return "<"
 
 
+class Prefix(Condition):
+    """
+    Equivalent to `column LIKE 'prefix%'` for a prefix without wildcards, but
+    written as a range so that SQLite can seek the index on `column`. Unlike
+    LIKE, the comparison is case-sensitive.
+    """
+
+    def __init__(self, column, prefix):
+        assert prefix
+        self.column = column
+        self.prefix = prefix
+
+    def _values(self):
+        upper_bound = self.prefix[:-1] + chr(ord(self.prefix[-1]) + 1)
+        return [self.prefix, upper_bound]
+
+    def _nonempty(self):
+        return True
+
+    def _key_parts(self):
+        return (self.column, self.prefix)
+
+    def _emit(self, sql, params):
+        sql.append(f"({self.column} >= ? AND {self.column} < ?)")
+        params.extend(self._values())
+
+
+class InTable(Condition):
+    """
+    Membership of `column` in a (temporary) table with one `value` column. Large
+    sets of values are loaded into such a table rather than bound one parameter
+    each, which would exceed SQLite's limit on host parameters.
+    """
+
+    def __init__(self, column, table, collation: str = None):
+        self.column = column
+        self.table = table
+        self.collation = collation
+
+    def _nonempty(self):
+        return True
+
+    def _key_parts(self):
+        return (self.column, self.table, self.collation)
+
+    def _emit(self, sql, params):
+        column = self.column
+        if self.collation:
+            column += f" COLLATE {self.collation}"
+        sql.append(f"({column} IN (SELECT value FROM {self.table}))")
+
+
+class Arg(Condition):
+    """
+    Compare the value of argument `name` in the `command` column with `operands`,
+    using the SQL functions that `DataBase` registers. Numeric operands are compared
+    numerically with `arg_num`, others as text with `arg`.
+    """
+
+    def __init__(self, name: str, keyword: str, *operands):
+        assert operands
+        self.name = name
+        self.keyword = keyword
+        self.operands = operands
+
+    def _numeric(self):
+        return all(isinstance(o, (int, float)) for o in self.operands)
+
+    def _nonempty(self):
+        return True
+
+    def _key_parts(self):
+        operands = tuple(map(str, self.operands))
+        return (self.name, self.keyword, self._numeric(), operands)
+
+    def _emit(self, sql, params):
+        function, placeholder = "arg", "?"
+        if self._numeric():
+            # parameters are bound as text
+            function, placeholder = "arg_num", "CAST(? AS REAL)"
+        placeholders = ",".join([placeholder] * len(self.operands))
+        if self.keyword in ("IN", "NOT IN"):
+            placeholders = f"({placeholders})"
+        sql.append(f"({function}(command, ?) {self.keyword} {placeholders})")
+        params.extend([self.name, *map(str, self.operands)])
+
+
+class HasFlag(Condition):
+    def __init__(self, name: str):
+        self.name = name
+
+    def _nonempty(self):
+        return True
+
+    def _key_parts(self):
+        return (self.name,)
+
+    def _emit(self, sql, params):
+        sql.append("(has_flag(command, ?))")
+        params.append(self.name)
+
+
+def is_literal(pattern: str) -> bool:
+    """
+    :return: whether the LIKE pattern contains no wildcards
+    """
+    return not any(c in pattern for c in "%_")
+
+
+def like(column, pattern) -> Condition:
+    return Like(column, str(pattern))
+
+
 class ManyToManyPredicate(Condition):
     def __init__(self, *conditions):
         for condition in conditions:
             assert isinstance(condition, Condition)
         self.conditions = [c for c in conditions if c]
 
-    def _values(self):
-        return [value for condition in self.conditions for value in condition.values()]
+    def _nonempty(self):
+        return bool(self.conditions)
 
-    def _str(self):
-        return f" {self._keyword()} ".join(map(str, self.conditions))
+    def _key_parts(self):
+        return (tuple(map(Condition.key, self.conditions)),)
+
+    def _emit(self, sql, params):
+        if self.conditions:
+            sql.append("(")
+            for i, condition in enumerate(self.conditions):
+                if i:
+                    sql.append(f" {self._keyword()} ")
+                condition.emit(sql, params)
+            sql.append(")")
 
     @abstractmethod
     def _keyword(self):
@@ -117,8 +302,207 @@ class Not(Condition):
         assert isinstance(condition, Condition)
         self.condition = condition
 
-    def _str(self):
-        return f"NOT {self.condition}"
-
-    def _values(self):
-        return self.condition.values()
+    def _nonempty(self):
+        return bool(self.condition)
+
+    def _key_parts(self):
+        return (self.condition.key(),)
+
+    def _emit(self, sql, params):
+        if self.condition:
+            sql.append("(NOT ")
+            self.condition.emit(sql, params)
+            sql.append(")")
+
+
+def like_to_glob(pattern: str) -> str:
+    """
+    Translate a LIKE pattern into the equivalent case-sensitive GLOB pattern.
+    """
+    replacements = {"%": "*", "_": "?", "*": "[*]", "?": "[?]", "[": "[[]"}
+    return "".join(replacements.get(c, c) for c in pattern)
+
+
+def plan(condition: Condition, case_sensitive: bool = False) -> Condition:
+    """
+    Rewrite a condition tree into an equivalent one that SQLite can answer with
+    the index on the column where possible:
+
+    - nested AND/OR are flattened and duplicate operands dropped,
+    - with `case_sensitive`, LIKE patterns without wildcards become `=` or, within
+      an OR, one `IN`, those that only end with `%` become a range, and the others
+      become GLOB patterns.
+
+    Otherwise LIKE patterns stay as they are, matching ASCII letters of either case.
+    SQLite answers them with an index on the column with the NOCASE collation.
+    """
+    if isinstance(condition, Like):
+        pattern, = condition._values()
+        if not case_sensitive:
+            return condition
+        prefix = pattern[:-1]
+        if is_literal(pattern):
+            return Equals(condition.column, pattern)
+        if pattern.endswith("%") and prefix and is_literal(prefix):
+            return Prefix(condition.column, prefix)
+        return Glob(condition.column, like_to_glob(pattern))
+    if isinstance(condition, Not):
+        inner = plan(condition.condition, case_sensitive=case_sensitive)
+        if isinstance(inner, Not):
+            return inner.condition
+        return Not(inner)
+    if isinstance(condition, ManyToManyPredicate):
+        operands = []
+        for operand in condition.conditions:
+            operand = plan(operand, case_sensitive=case_sensitive)
+            if type(operand) is type(condition):
+                operands.extend(operand.conditions)
+            elif operand:
+                operands.append(operand)
+        if isinstance(condition, Or):
+            operands = _merge_equalities(operands)
+        # dicts preserve order, and conditions hash by structure
+        operands = list(dict.fromkeys(operands))
+        if len(operands) == 1:
+            return operands[0]
+        return type(condition)(*operands)
+    return condition
+
+
+def _merge_equalities(operands: List[Condition]) -> List[Condition]:
+    values = {}
+    merged = []
+    for operand in operands:
+        if isinstance(operand, (Equals, In)):
+            if operand.column not in values:
+                values[operand.column] = []
+                merged.append(operand.column)
+            values[operand.column].extend(operand._values())
+        else:
+            merged.append(operand)
+
+    def merge(column):
+        column_values = list(dict.fromkeys(values[column]))
+        if len(column_values) == 1:
+            return Equals(column, *column_values)
+        return In(column, *column_values)
+
+    # strings in `merged` stand for the merged equalities on that column
+    return [merge(o) if isinstance(o, str) else o for o in merged]
+
+
+# an operator, a single- or double-quoted string, or a word
+WHERE_TOKEN = re.compile(
+    r"""\s*(?:(<=|>=|!=|==|=|<|>|\(|\)|,)|'([^']*)'|"([^"]*)"|([^\s()<>=!,'"]+))"""
+)
+WHERE_OPERATORS = {
+    "=": "=",
+    "==": "=",
+    "!=": "!=",
+    "<": "<",
+    "<=": "<=",
+    ">": ">",
+    ">=": ">=",
+}
+
+
+def parse_where(expression: str) -> Condition:
+    """
+    Parse an expression over the arguments of the `command` column, for example
+    `lr < 1e-3 and seed in (0, 1) and not cuda`, into a condition. It supports
+    `and`, `or`, `not`, parentheses, the comparisons `= != < <= > >=`, `in` and
+    `not in`. A name on its own tests for a flag. Unquoted numbers compare
+    numerically; other values compare as text.
+
+    :raise ValueError: if the expression is malformed
+    """
+    tokens = []
+    position = 0
+    expression = expression.rstrip()
+    while position < len(expression):
+        match = WHERE_TOKEN.match(expression, position)
+        if not match:
+            raise ValueError(f"Unexpected character in: {expression[position:]}")
+        operator, single_quoted, double_quoted, word = match.groups()
+        if operator is not None:
+            tokens.append(("operator", operator))
+        elif word is None:
+            text = single_quoted if double_quoted is None else double_quoted
+            tokens.append(("string", text))
+        elif word.lower() in ("and", "or", "not", "in"):
+            tokens.append(("keyword", word.lower()))
+        else:
+            tokens.append(("word", word))
+        position = match.end()
+    tokens.append(("end", None))
+    position = 0
+
+    def peek(*expected):
+        kind, text = tokens[position]
+        return (text if kind in ("operator", "keyword") else kind) in expected
+
+    def take(*expected):
+        nonlocal position
+        kind, text = tokens[position]
+        if expected and not peek(*expected):
+            found = "end of expression" if kind == "end" else repr(text)
+            expected = ["end of expression" if e == "end" else e for e in expected]
+            raise ValueError(f"Expected {' or '.join(expected)} but found {found}")
+        position += 1
+        return kind, text
+
+    def value():
+        kind, text = take("word", "string")
+        if kind == "word":
+            try:
+                return float(text)
+            except ValueError:
+                pass
+        return text
+
+    def disjunction():
+        conditions = [conjunction()]
+        while peek("or"):
+            take()
+            conditions.append(conjunction())
+        return conditions[0] if len(conditions) == 1 else Or(*conditions)
+
+    def conjunction():
+        conditions = [negation()]
+        while peek("and"):
+            take()
+            conditions.append(negation())
+        return conditions[0] if len(conditions) == 1 else And(*conditions)
+
+    def negation():
+        if peek("not"):
+            take()
+            return Not(negation())
+        return atom()
+
+    def atom():
+        if peek("("):
+            take()
+            condition = disjunction()
+            take(")")
+            return condition
+        _, name = take("word")
+        if peek(*WHERE_OPERATORS):
+            _, operator = take()
+            return Arg(name, WHERE_OPERATORS[operator], value())
+        if peek("in", "not"):
+            keyword = "NOT IN" if take()[1] == "not" else "IN"
+            if keyword == "NOT IN":
+                take("in")
+            take("(")
+            values = [value()]
+            while peek(","):
+                take()
+                values.append(value())
+            take(")")
+            return Arg(name, keyword, *values)
+        return HasFlag(name)
+
+    condition = disjunction()
+    take("end")
+    return condition
@@ -1,11 +1,20 @@
 # stdlib
 from collections import namedtuple
+from functools import lru_cache
 from typing import Tuple
 
 
 class RunEntry(
-    namedtuple("RunEntry", ["path", "command", "commit", "datetime", "description"])
+    namedtuple(
+        "RunEntry",
+        ["path", "command", "commit", "datetime", "description", "config_hash"],
+    )
 ):
+    """
+    `config_hash` is the `runs.command.config_hash` of the commit and of the command
+    without its prefix and runsrc arguments, or None if it is not known.
+    """
+
     __slots__ = ()
 
     class KeyError(KeyError):
@@ -30,3 +39,30 @@ class RunEntry(
             return getattr(self, key)
         except AttributeError:
             raise RunEntry.KeyError
+
+    @staticmethod
+    def projection(*fields: str) -> type:
+        """
+        :return: a lighter namedtuple type with the same methods as `RunEntry` that
+        only holds `fields`.
+        """
+        if fields == RunEntry._fields:
+            return RunEntry
+        return _projection(fields)
+
+
+# runs created before config hashes were stored have none
+RunEntry.__new__.__defaults__ = (None,)
+
+
+@lru_cache(maxsize=None)
+def _projection(fields: Tuple[str]) -> type:
+    assert set(fields) <= set(RunEntry._fields), fields
+    methods = dict(
+        __slots__=(),
+        KeyError=RunEntry.KeyError,
+        __str__=RunEntry.__str__,
+        asdict=RunEntry.asdict,
+        get=RunEntry.get,
+    )
+    return type("RunEntry", (namedtuple("RunEntry", fields),), methods)
@@ -0,0 +1,136 @@
+"""
+Points in the unit hypercube for sampling the arguments of sweeps, as used by
+`runs from-json --strategy`. Each strategy is a generator of `n` points in
+`dimensions` dimensions, with coordinates in [0, 1), that only depends on `rng`.
+"""
+
+# stdlib
+import random
+from typing import Callable, Iterator, List, Tuple
+
+Point = Tuple[float, ...]
+Strategy = Callable[[int, int, random.Random], Iterator[Point]]
+
+
+def uniform_points(dimensions: int, n: int, rng: random.Random) -> Iterator[Point]:
+    for _ in range(n):
+        yield tuple(rng.random() for _ in range(dimensions))
+
+
+def latin_hypercube_points(
+    dimensions: int, n: int, rng: random.Random
+) -> Iterator[Point]:
+    """
+    Each coordinate of the points falls once in each of `n` equal intervals of [0, 1)
+    """
+    strata = []
+    for _ in range(dimensions):
+        stratum = list(range(n))
+        rng.shuffle(stratum)
+        strata.append(stratum)
+    for i in range(n):
+        yield tuple((stratum[i] + rng.random()) / n for stratum in strata)
+
+
+# Joe and Kuo's direction numbers (new-joe-kuo-6.21201) for dimensions after the
+# first: the degree of the primitive polynomial, its coefficients other than the
+# first and last, and the initial direction numbers
+SOBOL_DIRECTIONS = [
+    (1, 0, (1,)),
+    (2, 1, (1, 3)),
+    (3, 1, (1, 3, 1)),
+    (3, 2, (1, 1, 1)),
+    (4, 1, (1, 1, 3, 3)),
+    (4, 4, (1, 3, 5, 13)),
+    (5, 2, (1, 1, 5, 5, 17)),
+    (5, 4, (1, 1, 5, 5, 5)),
+    (5, 7, (1, 1, 7, 11, 19)),
+    (5, 11, (1, 1, 5, 1, 1)),
+    (5, 13, (1, 1, 1, 3, 11)),
+    (5, 14, (1, 3, 5, 5, 31)),
+    (6, 1, (1, 3, 3, 9, 7, 49)),
+    (6, 13, (1, 1, 1, 15, 21, 21)),
+    (6, 16, (1, 3, 1, 13, 27, 49)),
+    (6, 19, (1, 1, 1, 15, 7, 5)),
+    (6, 22, (1, 3, 1, 15, 13, 25)),
+    (6, 25, (1, 1, 5, 5, 19, 61)),
+    (7, 1, (1, 3, 7, 11, 23, 15, 103)),
+    (7, 4, (1, 3, 7, 13, 13, 15, 69)),
+    (7, 7, (1, 1, 3, 13, 7, 35, 63)),
+    (7, 8, (1, 3, 5, 9, 1, 25, 53)),
+    (7, 14, (1, 3, 1, 13, 9, 35, 107)),
+    (7, 19, (1, 3, 1, 5, 27, 61, 31)),
+    (7, 21, (1, 1, 5, 11, 19, 41, 61)),
+    (7, 28, (1, 3, 5, 3, 3, 13, 69)),
+    (7, 31, (1, 1, 7, 13, 1, 19, 1)),
+    (7, 32, (1, 3, 7, 5, 13, 19, 59)),
+    (7, 37, (1, 1, 3, 9, 25, 29, 41)),
+    (7, 41, (1, 3, 5, 13, 23, 1, 55)),
+    (7, 42, (1, 3, 7, 3, 13, 59, 17)),
+    (7, 50, (1, 3, 1, 3, 5, 53, 69)),
+    (7, 55, (1, 1, 5, 5, 23, 33, 13)),
+    (7, 56, (1, 1, 7, 7, 1, 61, 123)),
+    (7, 59, (1, 1, 7, 9, 13, 61, 49)),
+    (7, 62, (1, 3, 3, 5, 3, 55, 33)),
+    (8, 14, (1, 3, 1, 15, 31, 13, 49, 245)),
+    (8, 21, (1, 3, 5, 15, 31, 59, 63, 97)),
+    (8, 22, (1, 3, 1, 11, 11, 11, 77, 249)),
+]
+SOBOL_MAX_DIMENSIONS = len(SOBOL_DIRECTIONS) + 1
+SOBOL_BITS = 32
+
+
+def sobol_direction_numbers(dimension: int) -> List[int]:
+    """
+    :return: the direction numbers of `dimension`, scaled to `SOBOL_BITS` bits
+    """
+    if dimension == 0:
+        return [1 << (SOBOL_BITS - k) for k in range(1, SOBOL_BITS + 1)]
+    degree, coefficients, initial = SOBOL_DIRECTIONS[dimension - 1]
+    directions = [m << (SOBOL_BITS - k) for k, m in enumerate(initial, start=1)]
+    for k in range(degree, SOBOL_BITS):
+        direction = directions[k - degree]
+        direction ^= direction >> degree
+        for i in range(1, degree):
+            if (coefficients >> (degree - 1 - i)) & 1:
+                direction ^= directions[k - i]
+        directions.append(direction)
+    return directions
+
+
+def sobol_points(dimensions: int, n: int, rng: random.Random) -> Iterator[Point]:
+    """
+    The Sobol sequence, in Gray code order, with a random digital shift so that the
+    first point is not the origin.
+
+    :raise ValueError: if there are more dimensions than `SOBOL_DIRECTIONS` covers
+    """
+    if dimensions > SOBOL_MAX_DIMENSIONS:
+        raise ValueError(
+            f"The sobol strategy supports at most {SOBOL_MAX_DIMENSIONS} arguments "
+            f"that vary, not {dimensions}."
+        )
+    if n > 2 ** SOBOL_BITS:
+        raise ValueError(f"The sobol strategy supports at most 2^{SOBOL_BITS} runs.")
+    directions = [sobol_direction_numbers(d) for d in range(dimensions)]
+    shift = [rng.getrandbits(SOBOL_BITS) for _ in range(dimensions)]
+    return sobol_sequence(directions, shift, n)
+
+
+def sobol_sequence(
+    directions: List[List[int]], point: List[int], n: int
+) -> Iterator[Point]:
+    for i in range(1, n + 1):
+        yield tuple(x / 2 ** SOBOL_BITS for x in point)
+        if i < n:
+            # in Gray code order, point i differs from point i - 1 by the direction
+            # numbers of the lowest set bit of i
+            bit = (i & -i).bit_length() - 1
+            point = [x ^ d[bit] for x, d in zip(point, directions)]
+
+
+STRATEGIES = {
+    "random": uniform_points,
+    "latin-hypercube": latin_hypercube_points,
+    "sobol": sobol_points,
+}
@@ -1,13 +1,13 @@
 # stdlib
 from collections import defaultdict
 import re
-from typing import List
+from typing import Dict, List, Set
 
 # first party
 from runs.arguments import add_query_args
 from runs.database import DataBase
 from runs.logger import Logger
-from runs.run_entry import RunEntry
+from runs.query import Condition
 from runs.util import natural_order
 
 
@@ -21,15 +21,23 @@ def add_subparser(subparsers):
 
 
 @DataBase.open
-@DataBase.query
-def cli(logger: Logger, runs: List[RunEntry], delimiter: str, *_, **__):
-    for string in strings(runs=runs, delimiter=delimiter):
+@DataBase.aggregate
+def cli(
+    logger: Logger, db: DataBase, condition: Condition, delimiter: str, *_, **__
+):
+    if delimiter == "=":
+        # `Command` splits arguments on "=", so `run_args` holds them parsed already
+        arg_dict = defaultdict(set)
+        for key, value in db.arg_values(condition):
+            arg_dict[key].add(value)
+    else:
+        runs = db.where(condition, columns=["command"])
+        arg_dict = parse_args([run.command for run in runs], delimiter=delimiter)
+    for string in strings(arg_dict=arg_dict, delimiter=delimiter):
         logger.print(string)
 
 
-def strings(runs: List[RunEntry], delimiter: str):
-    commands = [e.command for e in runs]
-    arg_dict = parse_args(commands, delimiter=delimiter)
+def strings(arg_dict: Dict[str, Set[str]], delimiter: str):
     return [
         f'{f}{delimiter}{"|".join(sorted(v, key=natural_order))}'
         for f, v in arg_dict.items()
@@ -1,21 +1,26 @@
 # stdlib
 import math
-import re
 from pathlib import Path
-from typing import Callable, Dict, List, Optional
+from typing import Dict, Iterable, List, Set, Tuple
+
+# third party
+import numpy as np
 
 # first party
 from runs.arguments import add_query_args
 from runs.command import Command
 from runs.database import DataBase
 from runs.logger import Logger
-from runs.run_entry import RunEntry
+from runs.metrics import DEFAULT_WORKERS, error_summary, metric_values, reader
+from runs.query import Condition
 from runs.util import PurePath
 
+MODES = ["indicator", "pearson", "spearman"]
+
 
 def add_subparser(subparsers):
     parser = subparsers.add_parser(
-        "correlate", help="Rank args by Pearson correlation."
+        "correlate", help="Rank args by their correlation with a value."
     )
     add_query_args(parser, with_sort=False)
     parser.add_argument(
@@ -23,10 +28,36 @@ def add_subparser(subparsers):
         required=True,
         type=Path,
         help="The command will look for a file at this path containing "
-        "a scalar value. It will calculate the pearson correlation between "
+        "a value, which --reader reads. It will calculate the correlation between "
         "args and this value. The keyword <path> will be replaced "
         "by the path of the run.",
     )
+    parser.add_argument(
+        "--reader",
+        dest="reader_spec",
+        default="scalar",
+        help="How to read the value from the file: scalar (a file holding only the "
+        'value), "json:KEY.PATH", or "csv-last:COLUMN", "csv-min:COLUMN" or '
+        '"csv-max:COLUMN" (the last, least or greatest value in a column), or '
+        '"tb-last:TAG", "tb-min:TAG" or "tb-max:TAG" (the same, of the scalars with '
+        "this tag in a TensorBoard event file or a directory of them).",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=DEFAULT_WORKERS,
+        help="Read this many files at a time.",
+    )
+    parser.add_argument(
+        "--mode",
+        choices=MODES,
+        default="indicator",
+        help="indicator: correlate the value with the presence of each argument, "
+        "such as --lr=0.001. pearson or spearman: correlate it with the number that "
+        "each key, such as --lr, takes, over the runs that have the key, and with the "
+        "presence of each flag. For keys whose values are not all numbers, report "
+        "the share of the value's variance that they explain (eta²) instead.",
+    )
     parser.add_argument(
         "--prefix",
         type=str,
@@ -36,84 +67,336 @@ def add_subparser(subparsers):
     return parser
 
 
-@DataBase.open
-@DataBase.query
+@DataBase.open_writable
+@DataBase.aggregate
 def cli(
     logger: Logger,
-    runs: List[RunEntry],
+    db: DataBase,
+    condition: Condition,
     value_path: Path,
+    reader_spec: str,
+    workers: int,
+    mode: str,
     prefix: str,
     args: List[str],
     *_,
     **__,
 ):
-    print("Analyzing the following runs", *[r.path for r in runs], sep="\n")
+    try:
+        reader(reader_spec)
+    except ValueError as e:
+        logger.exit(str(e))
+    paths = [run.path for run in db.where(condition, columns=["path"])]
+    logger.print("Analyzing the following runs", *paths, sep="\n")
     logger.print(
-        *strings(runs=runs, value_path=value_path, prefix=prefix, runsrc_args=args),
+        *strings(
+            logger=logger,
+            db=db,
+            condition=condition,
+            paths=paths,
+            value_path=value_path,
+            reader_spec=reader_spec,
+            workers=workers,
+            mode=mode,
+            prefix=prefix,
+            runsrc_args=args,
+        ),
         sep="\n",
     )
 
 
-def strings(*args, **kwargs):
-    cor = correlations(*args, **kwargs)
-    keys = sorted(cor.keys(), key=lambda k: cor[k])
-    return [f"{cor[k]}, {k}" for k in keys]
+def strings(*args, mode: str = "indicator", **kwargs):
+    if mode == "indicator":
+        cor = correlations(*args, **kwargs)
+        keys = sorted(cor.keys(), key=lambda k: cor[k])
+        return [f"{cor[k]}, {k}" for k in keys]
+    stats = sensitivities(*args, rank=mode == "spearman", **kwargs)
+
+    def explained_variance(key):
+        statistic, value = stats[key]
+        return value if statistic == "eta²" else value ** 2
+
+    keys = sorted(stats.keys(), key=explained_variance)
+    return [f"{stats[k][1]}, {k} ({stats[k][0]})" for k in keys]
 
 
 def correlations(
-    runs: List[RunEntry], value_path: Path, prefix: str, runsrc_args: List[str]
+    logger: Logger,
+    db: DataBase,
+    condition: Condition,
+    paths: List[PurePath],
+    value_path: Path,
+    prefix: str,
+    runsrc_args: List[str],
+    reader_spec: str = "scalar",
+    workers: int = DEFAULT_WORKERS,
 ) -> Dict[str, float]:
-    def mean(f: Callable) -> float:
-        try:
-            return sum(map(f, runs)) / float(len(runs))
-        except ZeroDivisionError:
-            return math.nan
-
-    def get_value(path: PurePath) -> Optional[float]:
-        path = Path(str(value_path).replace("<path>", str(path)).replace("\\", ""))
-        try:
-            with path.open() as f:
-                return float(f.read())
-        except (ValueError, FileNotFoundError):
-            print(f"{path} not found")
-            return
-
-    runs = [r for r in runs if get_value(r.path) is not None]
-    value_mean = mean(lambda run: get_value(run.path))
-    value_std_dev = math.sqrt(mean(lambda run: (get_value(run.path) - value_mean) ** 2))
-
-    def get_args(run):
-        command = Command(run.command, path=None).exclude(prefix, *runsrc_args)
-        yield from command.optional_strings()
-        yield from command.flag_strings()
-
-    def get_correlation(arg: str) -> float:
-        def contains_arg(run: RunEntry) -> float:
-            return float(arg in set(get_args(run)))
-
-        if sum(map(contains_arg, runs)) == len(runs):
-            return None
-
-        arg_mean = mean(contains_arg)
-
-        covariance = mean(
-            lambda run: (contains_arg(run) - arg_mean)
-            * (get_value(run.path) - value_mean)
+    """
+    :return: the Pearson correlation between the value at `value_path` and the
+    presence of each flag or optional argument, leaving out those of the prefix and
+    of the runsrc. Runs whose value is missing or not finite do not count, and nor do
+    arguments that every run has.
+    """
+    paths, values = metric_array(logger, db, paths, value_path, reader_spec, workers)
+    if not paths:
+        return {}
+    args, design = design_matrix(
+        db.keyword_args(condition),
+        paths=paths,
+        excluded=Command(prefix, *runsrc_args, path=None),
+    )
+    correlation = pearson(design, values)
+    in_every_run = design.all(axis=0)
+    return {
+        arg: c
+        for arg, c, every in zip(args, correlation.tolist(), in_every_run)
+        if not every
+    }
+
+
+def sensitivities(
+    logger: Logger,
+    db: DataBase,
+    condition: Condition,
+    paths: List[PurePath],
+    value_path: Path,
+    prefix: str,
+    runsrc_args: List[str],
+    reader_spec: str = "scalar",
+    workers: int = DEFAULT_WORKERS,
+    rank: bool = False,
+) -> Dict[str, Tuple[str, float]]:
+    """
+    :return: for the key of each flag and optional argument, leaving out those of the
+    prefix and of the runsrc, the name and value of a statistic: the Pearson (or with
+    `rank`, Spearman) correlation between the value at `value_path` and the number
+    that the key takes, or the presence of the flag; or eta² for keys whose values
+    are not all numbers. Keys that take only one value do not count.
+    """
+    paths, values = metric_array(logger, db, paths, value_path, reader_spec, workers)
+    if not paths:
+        return {}
+    numeric_keys, numbers, categorical_keys, categories = key_matrices(
+        db.keyword_args(condition),
+        paths=paths,
+        excluded=Command(prefix, *runsrc_args, path=None),
+    )
+    numbers_vary = varies(numbers)
+    if rank:
+        statistic = "spearman"
+        # rank the values among the runs that have each key
+        correlation = pearson_where_present(
+            ranks(numbers),
+            ranks(np.where(np.isnan(numbers), np.nan, values[:, None])),
         )
+    else:
+        statistic = "pearson"
+        correlation = pearson_where_present(numbers, values)
+    eta = eta_squared(categories, values)
+    stats = {
+        key: (statistic, c)
+        for key, c, vary in zip(numeric_keys, correlation.tolist(), numbers_vary)
+        if vary
+    }
+    for key, e, n_categories in zip(
+        categorical_keys, eta.tolist(), categories.max(axis=0, initial=0) + 1
+    ):
+        if n_categories > 1:
+            stats[key] = ("eta²", e)
+    return stats
 
-        std_dev = math.sqrt(mean(lambda run: (contains_arg(run) - arg_mean) ** 2))
 
-        # return covariance
-        denominator = std_dev * value_std_dev
-        if denominator:
-            return covariance / denominator
-        else:
-            return math.inf
+def metric_array(
+    logger: Logger,
+    db: DataBase,
+    paths: List[PurePath],
+    value_path: Path,
+    reader_spec: str,
+    workers: int,
+) -> Tuple[List[PurePath], np.ndarray]:
+    """
+    :return: the paths of the runs whose value at `value_path` is finite, and their
+    values
+    """
+    values, errors = metric_values(db, paths, value_path, reader_spec, workers)
+    for line in error_summary(errors):
+        logger.print(line)
+    paths = [p for p in paths if p in values and math.isfinite(values[p])]
+    return paths, np.array([values[p] for p in paths])
 
-    args = {arg for run in runs for arg in get_args(run)}
-    correlations = {arg: get_correlation(arg) for arg in args}
-    return {
-        arg: correlation
-        for arg, correlation in correlations.items()
-        if correlation is not None
+
+def excluded_keys(excluded: Command) -> Set[str]:
+    return {key for (key, _), _ in excluded.optionals} | {
+        word for word, _ in excluded.flags
     }
+
+
+def design_matrix(
+    keyword_args: Iterable[Tuple[str, str, str]],
+    paths: List[PurePath],
+    excluded: Command,
+) -> Tuple[List[str], np.ndarray]:
+    """
+    :param keyword_args: (path, key, value) of each argument, as in `run_args`
+    :return: the arguments, and a matrix with a row for each of `paths` and a column
+    for each argument, that is 1 where the run has the argument and 0 elsewhere
+    """
+    excluded = excluded_keys(excluded)
+    rows = {str(path): i for i, path in enumerate(paths)}
+    columns = {}
+    row_indices = []
+    column_indices = []
+    for path, key, value, *_ in keyword_args:
+        if key in excluded or path not in rows:
+            continue
+        arg = key if value is None else f"{key}={value}"
+        row_indices.append(rows[path])
+        column_indices.append(columns.setdefault(arg, len(columns)))
+    design = np.zeros((len(paths), len(columns)))
+    design[row_indices, column_indices] = 1
+    return list(columns), design
+
+
+def key_matrices(
+    keyword_args: Iterable[Tuple[str, str, str, float]],
+    paths: List[PurePath],
+    excluded: Command,
+) -> Tuple[List[str], np.ndarray, List[str], np.ndarray]:
+    """
+    :param keyword_args: (path, key, value, numeric_value) of each argument, as in
+    `run_args`
+    :return: the keys that are flags or whose values are all numbers, and a matrix
+    with a row for each of `paths` and a column for each of those keys, that holds the
+    number, or NaN where the run does not have the key (for flags, 1 where the run
+    has it and 0 elsewhere); then the other keys, and a matrix that holds the index of
+    the value among the values of the key, or -1 where the run does not have it
+    """
+    excluded = excluded_keys(excluded)
+    rows = {str(path): i for i, path in enumerate(paths)}
+    args = {}
+    for path, key, value, numeric_value in keyword_args:
+        if key not in excluded and path in rows:
+            args.setdefault(key, []).append((rows[path], value, numeric_value))
+    numeric_keys, numeric_columns = [], []
+    categorical_keys, categorical_columns = [], []
+    for key, key_args in args.items():
+        row_indices, values, numbers = map(list, zip(*key_args))
+        if all(value is None for value in values):
+            column = np.zeros(len(paths))
+            column[row_indices] = 1
+        elif None not in numbers:
+            column = np.full(len(paths), np.nan)
+            column[row_indices] = numbers
+        else:
+            categories = {}
+            column = np.full(len(paths), -1)
+            column[row_indices] = [
+                categories.setdefault(value, len(categories)) for value in values
+            ]
+            categorical_keys.append(key)
+            categorical_columns.append(column)
+            continue
+        numeric_keys.append(key)
+        numeric_columns.append(column)
+
+    def matrix(columns, dtype):
+        return np.array(columns, dtype=dtype).reshape(len(columns), len(paths)).T
+
+    return (
+        numeric_keys,
+        matrix(numeric_columns, float),
+        categorical_keys,
+        matrix(categorical_columns, int),
+    )
+
+
+def pearson(design: np.ndarray, values: np.ndarray) -> np.ndarray:
+    """
+    :return: the Pearson correlation between `values` and each column of `design`,
+    or inf where either does not vary
+    """
+    design = design - design.mean(axis=0)
+    values = values - values.mean()
+    covariance = values @ design / len(values)
+    std_devs = np.sqrt((design ** 2).mean(axis=0) * (values ** 2).mean())
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(std_devs > 0, covariance / std_devs, np.inf)
+
+
+def varies(matrix: np.ndarray) -> np.ndarray:
+    """
+    :return: whether each column of `matrix` holds more than one value, ignoring NaN
+    """
+    present = ~np.isnan(matrix)
+    least = np.where(present, matrix, np.inf).min(axis=0, initial=np.inf)
+    greatest = np.where(present, matrix, -np.inf).max(axis=0, initial=-np.inf)
+    return least < greatest
+
+
+def ranks(matrix: np.ndarray) -> np.ndarray:
+    """
+    :return: the rank of each entry of `matrix` within its column, from 1, where tied
+    entries share the mean of their ranks and NaN stays NaN
+    """
+    rows, columns = np.nonzero(~np.isnan(matrix))
+    entries = matrix[rows, columns]
+    order = np.lexsort((entries, columns))
+    entries, columns = entries[order], columns[order]
+    starts_tie = np.ones(len(order), dtype=bool)
+    starts_tie[1:] = (entries[1:] != entries[:-1]) | (columns[1:] != columns[:-1])
+    tie_starts = np.flatnonzero(starts_tie)
+    tie_ends = np.append(tie_starts[1:], len(order))
+    mean_positions = (tie_starts + tie_ends - 1) / 2
+    column_starts = np.searchsorted(columns, columns)
+    ranked = np.full(matrix.shape, np.nan)
+    ranked[rows[order], columns] = (
+        mean_positions[np.cumsum(starts_tie) - 1] - column_starts + 1
+    )
+    return ranked
+
+
+def pearson_where_present(x: np.ndarray, y: np.ndarray) -> np.ndarray:
+    """
+    :param x: a matrix with a column for each variable, NaN where it is missing
+    :param y: a vector, or a matrix shaped like `x`
+    :return: the Pearson correlation between `y` and each column of `x` over the rows
+    where both are present, or inf where either does not vary
+    """
+    x, y = np.broadcast_arrays(x, y[:, None] if y.ndim == 1 else y)
+    missing = np.isnan(x) | np.isnan(y)
+    x, y = np.where(missing, np.nan, x), np.where(missing, np.nan, y)
+    both_vary = varies(x) & varies(y)
+    count = (~missing).sum(axis=0)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        x = np.where(missing, 0, x - np.nansum(x, axis=0) / count)
+        y = np.where(missing, 0, y - np.nansum(y, axis=0) / count)
+        correlation = (x * y).sum(axis=0) / np.sqrt(
+            (x ** 2).sum(axis=0) * (y ** 2).sum(axis=0)
+        )
+    return np.where(both_vary, correlation, np.inf)
+
+
+def eta_squared(categories: np.ndarray, values: np.ndarray) -> np.ndarray:
+    """
+    :param categories: a matrix with a column for each variable, that holds the index
+    of its category, or -1 where it is missing
+    :return: the share of the variance of `values` that the category of each variable
+    explains (eta² of a one-way ANOVA) over the rows where it is present, or inf
+    where `values` do not vary
+    """
+    present = categories >= 0
+    rows, columns = np.nonzero(present)
+    n_columns = categories.shape[1]
+    n_categories = categories.max(initial=0) + 1
+    groups = columns * n_categories + categories[rows, columns]
+    count = np.bincount(columns, minlength=n_columns)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        means = np.bincount(columns, values[rows], minlength=n_columns) / count
+        deviations = values[rows] - means[columns]
+        total = np.bincount(columns, deviations ** 2, minlength=n_columns)
+        group_count = np.bincount(groups, minlength=n_columns * n_categories)
+        group_sum = np.bincount(groups, deviations, minlength=n_columns * n_categories)
+        between = np.where(group_count > 0, group_sum ** 2 / group_count, 0)
+        eta = between.reshape(n_columns, n_categories).sum(axis=1) / total
+    values_vary = varies(np.where(present, values[:, None], np.nan))
+    return np.where(values_vary, eta, np.inf)
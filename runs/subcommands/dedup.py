@@ -0,0 +1,86 @@
+# stdlib
+from collections import defaultdict
+from typing import Dict, List
+
+# first party
+from runs.arguments import add_query_args
+from runs.command import Command, config_hash
+from runs.database import DataBase
+from runs.logger import Logger
+from runs.query import Condition
+from runs.util import highlight
+
+
+def add_subparser(subparsers):
+    parser = subparsers.add_parser(
+        "dedup",
+        help="List runs with the same commit and arguments as an older run.",
+    )
+    add_query_args(parser, with_sort=False)
+    parser.add_argument(
+        "--prefix",
+        type=str,
+        help="The prefix of runs that were created before config hashes were "
+        "stored, which does not count towards their config hash.",
+    )
+    parser.add_argument(
+        "--porcelain",
+        action="store_true",
+        help="Print only the paths of runs that duplicate an older one, for example "
+        "for `runs rm`.",
+    )
+    return parser
+
+
+@DataBase.open
+@DataBase.aggregate
+def cli(
+    logger: Logger,
+    db: DataBase,
+    condition: Condition,
+    prefix: str,
+    args: List[str],
+    porcelain: bool,
+    *_,
+    **__,
+):
+    groups = duplicates(db=db, condition=condition, prefix=prefix, runsrc_args=args)
+    for line in strings(groups, porcelain=porcelain):
+        logger.print(line)
+
+
+def duplicates(
+    db: DataBase, condition: Condition, prefix: str, runsrc_args: List[str]
+) -> Dict[str, List[str]]:
+    """
+    Runs that were created before config hashes were stored have none, so theirs is
+    computed here, without storing it. Since their commands are stored with <path>
+    replaced, runs whose commands refer to their own path never share a hash.
+
+    :return: the paths of the runs that match `condition`, from oldest to newest, for
+    each config hash that more than one of them has
+    """
+    runs = db.where(
+        condition, order="datetime", columns=["command", "commit", "config_hash"]
+    )
+    groups = defaultdict(list)
+    for run in runs:
+        config = run.config_hash
+        if config is None:
+            command = Command(run.command, path=run.path)
+            config = config_hash(run.commit, command.exclude(prefix, *runsrc_args))
+        groups[config].append(str(run.path))
+    return {
+        config: paths for config, paths in sorted(groups.items()) if len(paths) > 1
+    }
+
+
+def strings(groups: Dict[str, List[str]], porcelain: bool) -> List[str]:
+    lines = []
+    for config, (oldest, *duplicates) in groups.items():
+        if porcelain:
+            lines += duplicates
+        else:
+            lines.append(highlight(oldest, ":", sep="") + f" (config {config[:12]})")
+            lines += [f"  {path}" for path in duplicates]
+    return lines
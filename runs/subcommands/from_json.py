@@ -1,14 +1,19 @@
 # stdlib
+from collections import namedtuple
+from functools import reduce
 import itertools
 import json
+import math
+import operator
 from pathlib import Path
 import random
-from typing import Dict, List, Union
+from typing import Dict, List, Set, Union
 
 # first party
 from runs.command import Command
 from runs.logger import UI
-from runs.subcommands.new import new
+from runs.sampling import STRATEGIES
+from runs.subcommands.new import NewRun, new
 from runs.transaction.transaction import Transaction
 from runs.util import PurePath
 
@@ -54,6 +59,41 @@ def add_subparser(subparsers):
         type=int,
         help="If more than this many runs are generated from the cross produce of arguments in the JSON object, <max_runs> runs will will randomly be sampled from the full list.",
     )
+    parser.add_argument(
+        "--skip-existing",
+        action="store_true",
+        help="Do not start runs whose commit and arguments (other than the prefix and "
+        "the runsrc args) are the same as those of a run in the database.",
+    )
+    parser.add_argument(
+        "--jsonl",
+        action="store_true",
+        help="Read the spec as one JSON object per line, and start runs in chunks "
+        "as it is read, so that sweeps of any size fit in memory. Runs are always "
+        "numbered, even if there is only one. Does not support --max-runs.",
+    )
+    parser.add_argument(
+        "--chunk-size",
+        type=int,
+        default=1000,
+        help="With --jsonl, start this many runs at a time.",
+    )
+    parser.add_argument(
+        "--strategy",
+        choices=["grid", *STRATEGIES],
+        default="grid",
+        help="grid: every combination of the arguments in the JSON object, or a "
+        "random subset of <max_runs> of them. random: <max_runs> independent random "
+        "choices of each argument. latin-hypercube or sobol: <max_runs> choices that "
+        "cover the arguments more evenly. All but grid also accept numeric ranges "
+        'such as "lr": {"min": 1e-5, "max": 0.1, "log": true}.',
+    )
+    parser.add_argument(
+        "--seed",
+        type=int,
+        help="Seed for sampling runs with --max-runs, so that the same runs are "
+        "sampled again.",
+    )
 
     return parser
     # new_parser.add_argument(
@@ -84,6 +124,19 @@ class SpecObj:
 
 
 ARG_KWD = "<arg>"
+NumericRange = namedtuple("NumericRange", "key min max log")
+
+
+def sample_indices(population: int, k: int, rng: random.Random) -> Set[int]:
+    """
+    :return: `k` distinct integers in `range(population)`, in O(k) time and memory
+    even when `population` is too large for `random.sample` (Floyd's algorithm)
+    """
+    sample = set()
+    for j in range(population - k, population):
+        i = rng.randrange(j + 1)
+        sample.add(j if i in sample else i)
+    return sample
 
 
 @Transaction.wrapper
@@ -96,24 +149,55 @@ def cli(
     description: str,
     transaction: Transaction,
     max_runs: int,
+    strategy: str,
+    seed: int,
+    jsonl: bool,
+    chunk_size: int,
+    skip_existing: bool,
     *_,
     **__,
 ):
     # spec: Path
     if not spec.exists():
         logger.exit(f"{spec.absolute()} does not exist.")
-    with spec.open() as f:
-        obj = json.load(f, object_pairs_hook=lambda pairs: pairs)
-    try:
-        try:
-            spec_objs = [SpecObj(**dict(obj))]
-        except ValueError:
-            spec_objs = [SpecObj(**dict(o)) for o in obj]
-    except TypeError:
+    if jsonl and (max_runs is not None or strategy != "grid"):
+        logger.exit("--jsonl only supports the grid strategy, without --max-runs.")
+    if chunk_size < 1:
+        logger.exit("--chunk-size must be at least 1.")
+
+    def invalid_spec():
         logger.exit(
             f"Each object in {spec} must have a " '"command" field and a "args" field.'
         )
 
+    def jsonl_spec_objs():
+        with spec.open() as f:
+            for number, line in enumerate(f, start=1):
+                if line.strip():
+                    try:
+                        obj = json.loads(line, object_pairs_hook=lambda pairs: pairs)
+                    except json.JSONDecodeError as e:
+                        logger.exit(f"Line {number} of {spec} is not valid JSON: {e}")
+                    try:
+                        yield SpecObj(**dict(obj))
+                    except (TypeError, ValueError):
+                        logger.exit(
+                            f"Line {number} of {spec} must be an object with a "
+                            '"command" field and a "args" field.'
+                        )
+
+    if jsonl:
+        spec_objs = jsonl_spec_objs()
+    else:
+        with spec.open() as f:
+            obj = json.load(f, object_pairs_hook=lambda pairs: pairs)
+        # objects are lists of pairs, so an array of them is a list of lists
+        is_array = bool(obj) and all(isinstance(o, list) for o in obj)
+        try:
+            spec_objs = [SpecObj(**dict(o)) for o in (obj if is_array else [obj])]
+        except (TypeError, ValueError):
+            invalid_spec()
+
     def listify(x):
         if isinstance(x, list):
             return x
@@ -139,26 +223,143 @@ def cli(
         else:
             yield [None]
 
+    def numeric_range(key, pairs) -> NumericRange:
+        bounds = dict(pairs)
+        if not {"min", "max"} <= set(bounds) <= {"min", "max", "log"}:
+            logger.exit(
+                f'The range of {key} must have "min" and "max" fields, and may have a '
+                '"log" field.'
+            )
+        low, high, log = bounds["min"], bounds["max"], bounds.get("log", False)
+        if not (0 if log else -math.inf) < low < high:
+            logger.exit(
+                f"The range of {key} must have min < max, and 0 < min if it is log."
+            )
+        return NumericRange(key, low, high, log)
+
     def group_args(spec):
         for k, v in spec.args or []:
-            yield list(arg_alternatives(k, v))
+            # JSON objects are loaded as lists of (key, value) tuples
+            if isinstance(v, list) and v and all(isinstance(p, tuple) for p in v):
+                yield numeric_range(k, v)
+            else:
+                yield list(arg_alternatives(k, v))
         yield list(flag_alternatives(spec.flags))
 
-    def arg_assignments():
+    def choose(group, coordinate: float):
+        if isinstance(group, NumericRange):
+            if group.log:
+                low, high = math.log(group.min), math.log(group.max)
+                value = math.exp(low + coordinate * (high - low))
+            else:
+                value = group.min + coordinate * (group.max - group.min)
+            return [prepend(f'{group.key}="{value:.6g}"')]
+        return group[min(int(coordinate * len(group)), len(group) - 1)]
+
+    def size(groups):
+        return reduce(operator.mul, map(len, groups), 1)
+
+    def has_range(groups):
+        return any(isinstance(group, NumericRange) for group in groups)
+
+    def range_error():
+        logger.exit(
+            'Ranges such as {"min": 0, "max": 1} need --strategy random, '
+            "latin-hypercube or sobol."
+        )
+
+    def streamed_spec_groups():
         for spec in spec_objs:
-            for arg_set in itertools.product(*group_args(spec)):
-                yield spec.command, [a for s in arg_set for a in s if a]
+            groups = list(group_args(spec))
+            if has_range(groups):
+                range_error()
+            yield spec.command, groups
 
-    assignments = list(arg_assignments())
-    if max_runs is not None and len(assignments) > max_runs:
-        random.shuffle(assignments)
-        assignments = assignments[:max_runs]
-    for i, (command, arg_set) in enumerate(assignments):
-        new_path = path if len(assignments) == 1 else PurePath(path, str(i))
-        command = Command(prefix, command, *arg_set, *args, path=new_path)
+    if jsonl:
+        spec_groups = streamed_spec_groups()
+    else:
+        spec_groups = [(spec.command, list(group_args(spec))) for spec in spec_objs]
+
+    def arg_assignments():
+        for command, groups in spec_groups:
+            for arg_set in itertools.product(*groups):
+                yield command, [a for s in arg_set for a in s if a]
+
+    def arg_assignment(index: int):
+        # the inverse of the enumeration of `arg_assignments`, in which the last
+        # group varies fastest, like the digits of a mixed-radix number
+        for command, groups in spec_groups:
+            if index < size(groups):
+                break
+            index -= size(groups)
+        arg_set = []
+        for group in reversed(groups):
+            index, digit = divmod(index, len(group))
+            arg_set.append(group[digit])
+        return command, [a for s in reversed(arg_set) for a in s if a]
+
+    def varies(group):
+        return isinstance(group, NumericRange) or len(group) > 1
+
+    def sampled_assignments(spec_points):
+        for command, groups, points in spec_points:
+            for point in points:
+                coordinates = iter(point)
+                arg_set = [
+                    choose(group, next(coordinates)) if varies(group) else group[0]
+                    for group in groups
+                ]
+                yield command, [a for s in arg_set for a in s if a]
+
+    if jsonl:
+        assignments = arg_assignments()
+        n_assignments = None
+    elif strategy != "grid":
+        if max_runs is None:
+            logger.exit(f"--strategy {strategy} needs --max-runs.")
+        rng = random.Random(seed)
+        # objects with an argument that has no values have no runs
+        specs = [
+            (command, groups) for command, groups in spec_groups if [] not in groups
+        ]
+        spec_points = []
+        for i, (command, groups) in enumerate(specs):
+            # the runs are shared out between the objects in the JSON file
+            n_runs = max_runs // len(specs) + (i < max_runs % len(specs))
+            try:
+                points = STRATEGIES[strategy](sum(map(varies, groups)), n_runs, rng)
+            except ValueError as e:
+                logger.exit(str(e))
+            spec_points.append((command, groups, points))
+        assignments = sampled_assignments(spec_points)
+        n_assignments = max_runs if specs else 0
+    elif any(has_range(groups) for _, groups in spec_groups):
+        range_error()
+    else:
+        n_assignments = sum(size(groups) for _, groups in spec_groups)
+        if max_runs is not None and n_assignments > max_runs:
+            indices = sample_indices(n_assignments, max_runs, random.Random(seed))
+            assignments = map(arg_assignment, sorted(indices))
+            n_assignments = max_runs
+        else:
+            assignments = arg_assignments()
+
+    def add_runs(runs):
         new(
-            path=new_path,
-            command=command,
-            description=description,
+            runs=runs,
             transaction=transaction,
+            excluded=(prefix, *args),
+            skip_existing=skip_existing,
         )
+
+    runs = []
+    for i, (command, arg_set) in enumerate(assignments):
+        if jsonl and i and i % chunk_size == 0:
+            # start the runs so far, so that they need not be held in memory
+            add_runs(runs)
+            transaction.commit()
+            runs = []
+        new_path = path if n_assignments == 1 else PurePath(path, str(i))
+        command = Command(prefix, command, *arg_set, *args, path=new_path)
+        runs.append(NewRun(new_path, command, description))
+    add_runs(runs)
@@ -1,6 +1,6 @@
 # stdlib
 from copy import deepcopy
-from typing import List
+from typing import Iterable
 
 # first party
 from runs.arguments import DEFAULT_QUERY_ARGS, add_query_args
@@ -18,7 +18,7 @@ def add_subparser(subparsers):
 
 
 @Transaction.wrapper
-@DataBase.query
-def cli(runs: List[RunEntry], transaction: Transaction, *_, **__):
+@DataBase.projected(["path"])
+def cli(runs: Iterable[RunEntry], transaction: Transaction, *_, **__):
     for path in set(run.path for run in runs):
         transaction.kill(path)
@@ -1,5 +1,5 @@
 # stdlib
-from typing import Dict, List
+from typing import Dict, Iterable, Iterator, List, Optional
 
 # first party
 from runs.arguments import add_query_args
@@ -27,10 +27,14 @@ def add_subparser(subparsers):
     return parser
 
 
+def columns(key: str, *_, **__) -> Optional[List[str]]:
+    return None if key == "all" else [key]
+
+
 @DataBase.open
-@DataBase.query
+@DataBase.projected(columns)
 def cli(
-    runs: List[RunEntry],
+    runs: Iterable[RunEntry],
     db: DataBase,
     logger: Logger,
     key: str,
@@ -38,26 +42,23 @@ def cli(
     *_,
     **__
 ):
-    logger.print(string(runs=runs, key=key, porcelain=porcelain))
+    for line in strings(runs=runs, key=key, porcelain=porcelain):
+        logger.print(line)
 
 
-def string(runs: List[RunEntry], key: str, porcelain: bool = True) -> str:
+def string(runs: Iterable[RunEntry], key: str, porcelain: bool = True) -> str:
     return "\n".join(strings(runs=runs, key=key, porcelain=porcelain))
 
 
-def strings(runs: List[RunEntry], key: str, porcelain: bool) -> List[str]:
-    if key == "all":
-        for entry in runs:
+def strings(runs: Iterable[RunEntry], key: str, porcelain: bool) -> Iterator[str]:
+    for entry in runs:
+        if key == "all":
             yield str(entry)
-    else:
-        attr_dict = get_dict(runs=runs, key=key)
-        if porcelain:
-            for value in attr_dict.values():
-                yield str(value)
+        elif porcelain:
+            yield str(entry.get(key))
         else:
-            for path, attr in attr_dict.items():
-                yield highlight(path, ": ", sep="") + str(attr)
+            yield highlight(entry.path, ": ", sep="") + str(entry.get(key))
 
 
-def get_dict(runs: List[RunEntry], key: str) -> Dict[PurePath, str]:
+def get_dict(runs: Iterable[RunEntry], key: str) -> Dict[PurePath, str]:
     return {entry.path: entry.get(key) for entry in runs}
@@ -1,7 +1,7 @@
 # stdlib
 from collections import defaultdict
 from itertools import zip_longest
-from typing import List
+from typing import Iterable
 
 # first party
 from runs.arguments import DEFAULT_QUERY_ARGS, add_query_args
@@ -30,17 +30,20 @@ def add_subparser(subparsers):
 
 
 @DataBase.open
-@DataBase.query
-def cli(runs: List[RunEntry], logger: Logger, pprint: bool, depth, *_, **__):
-    logger.print(string(runs=runs, pprint=pprint, depth=depth))
+@DataBase.projected(["path"])
+def cli(runs: Iterable[RunEntry], logger: Logger, pprint: bool, depth, *_, **__):
+    for path in paths(runs=runs, pprint=pprint, depth=depth):
+        logger.print(path)
 
 
-def string(runs: List[RunEntry], pprint: bool = False, depth: int = None) -> str:
+def string(runs: Iterable[RunEntry], pprint: bool = False, depth: int = None) -> str:
     return "\n".join(map(str, paths(runs=runs, pprint=pprint, depth=depth)))
 
 
-def paths(runs: List[RunEntry], pprint: bool = True, depth: int = None) -> List[str]:
-    _paths = [PurePath(*e.path.parts[:depth]) for e in runs]
+def paths(
+    runs: Iterable[RunEntry], pprint: bool = True, depth: int = None
+) -> Iterable[PurePath]:
+    _paths = (PurePath(*e.path.parts[:depth]) for e in runs)
     if depth is not None:
         _paths = sorted(set(_paths), key=lambda p: natural_order(str(p)))
     return tree_strings(build_tree(_paths)) if pprint else _paths
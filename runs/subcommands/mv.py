@@ -1,11 +1,11 @@
 # stdlib
 from collections import defaultdict
 from copy import deepcopy
-import sqlite3
 
 # first party
 from runs.arguments import DEFAULT_QUERY_ARGS, add_query_args
 from runs.database import DataBase, QueryArgs
+from runs.pattern import compile_like
 from runs.transaction.transaction import Transaction
 from runs.util import PurePath
 
@@ -44,7 +44,7 @@ def add_subparser(subparsers):
 
 
 @Transaction.wrapper
-@DataBase.query
+@DataBase.aggregate
 def cli(
     query_args: QueryArgs,
     destination: str,
@@ -74,17 +74,20 @@ def move(
         [dest_path == ".", f"{dest_path}/%" in db, dest_path.endswith("/")]
     )
 
+    # (src, dest) for each run, so that the destinations are looked up at once
+    moves = []
     for src_pattern in query_args.patterns:
         dest_to_src = defaultdict(list)
-        src_entries = db.get(**query_args._replace(patterns=[src_pattern])._asdict())
+        matches_pattern = compile_like(str(src_pattern) + "%")
+        src_entries = db.stream(
+            **query_args._replace(patterns=[src_pattern])._asdict(), columns=["path"]
+        )
 
         for entry in src_entries:
 
             # parent, grandparent, great-grandparent, etc.
             parents = [str(entry.path)] + [str(p) + "/" for p in entry.path.parents]
-            matches = [
-                p for p in reversed(parents) if like(str(p), str(src_pattern) + "%")
-            ]
+            matches = [p for p in reversed(parents) if matches_pattern(p)]
 
             head = next(iter(matches))  # a/b/% -> a/b
             tail = PurePath(*[PurePath(m).name for m in matches])  # a/b/% -> c/d
@@ -98,20 +101,12 @@ def move(
         for dest, srcs in dest_to_src.items():
             for i, src in enumerate(srcs):
                 if len(srcs) > 1:
-                    dest = PurePath(dest, str(i))
+                    moves.append((src, PurePath(dest, str(i))))
                 else:
-                    dest = PurePath(dest)
-                transaction.move(src=src, dest=dest, kill_tmux=kill_tmux)
-                if dest in db:
-                    transaction.remove(dest)
-
-
-def like(a: str, b: str) -> bool:
-    conn = sqlite3.connect(":memory:")
-    try:
-        c = conn.cursor()
-        c.execute("SELECT ? LIKE ?", (a, b))
-        result, = c.fetchone()
-        return bool(result)
-    finally:
-        conn.close()
+                    moves.append((src, PurePath(dest)))
+
+    existing = db.existing_paths(dest for _, dest in moves)
+    for src, dest in moves:
+        transaction.move(src=src, dest=dest, kill_tmux=kill_tmux)
+        if str(dest) in existing:
+            transaction.remove(dest)
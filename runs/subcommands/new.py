@@ -2,15 +2,21 @@
 from argparse import ArgumentParser
 from datetime import datetime
 import itertools
-from typing import List
+from typing import List, NamedTuple, Optional
 
 # first party
-from runs.command import Command
+from runs.command import Command, config_hash
 from runs.logger import UI
 from runs.transaction.transaction import Transaction
 from runs.util import PurePath
 
 
+class NewRun(NamedTuple):
+    path: PurePath
+    command: Command
+    description: Optional[str]
+
+
 def add_subparser(subparsers):
     parser = subparsers.add_parser(
         "new",
@@ -61,6 +67,12 @@ def add_subparser(subparsers):
         action="append",
         help="directories to create and sync automatically with each run",
     )
+    parser.add_argument(
+        "--skip-existing",
+        action="store_true",
+        help="Do not start runs whose commit and arguments (other than the prefix and "
+        "the runsrc args) are the same as those of a run in the database.",
+    )
     return parser
     # new_parser.add_argument(
     #     '--summary-path',
@@ -76,6 +88,7 @@ def cli(
     logger: UI,
     descriptions: List[str],
     transaction: Transaction,
+    skip_existing: bool,
     *_,
     **__
 ):
@@ -91,6 +104,7 @@ def cli(
             "where n is the number of subcommands."
         )
     descriptions = descriptions or []
+    runs = []
     iterator = enumerate(itertools.zip_longest(paths, commands, descriptions))
     for i, (path, command, description) in iterator:
         if path is None:
@@ -101,25 +115,53 @@ def cli(
         if description is None:
             if descriptions:
                 description = descriptions[0]
+        command = Command(prefix, command, *args, path=path)
+        runs.append(NewRun(path, command, description))
+
+    new(
+        runs=runs,
+        transaction=transaction,
+        excluded=(prefix, *args),
+        skip_existing=skip_existing,
+    )
 
-        new(
-            command=Command(prefix, command, *args, path=path),
-            description=description,
-            path=path,
-            transaction=transaction,
-        )
 
+def new(runs, transaction, excluded=(), skip_existing=False):
+    """
+    Add `runs` to `transaction`, replacing runs in the database that have the same
+    paths. The database is queried once for all of `runs`.
 
-def new(command, description, path, transaction):
+    :param runs: a `NewRun` for each run
+    :param excluded: the prefix and runsrc args, which do not count towards the
+    config hash of the run
+    :param skip_existing: whether to leave out runs whose config hash a run in the
+    database has
+    """
     bash = transaction.bash
-    if description is None:
-        description = bash.cmd("git log -1 --pretty=%B".split())
-    if path in transaction.db:
-        transaction.remove(path)
-    transaction.add_run(
-        path=path,
-        command=command,
-        commit=bash.last_commit(),
-        datetime=datetime.now().isoformat(),
-        description=description,
-    )
+    db = transaction.db
+    commit = bash.last_commit()
+    configs = [config_hash(commit, run.command.exclude(*excluded)) for run in runs]
+    existing_configs = db.paths_with_configs(configs) if skip_existing else {}
+    existing_paths = db.existing_paths(run.path for run in runs)
+    last_commit_message = None
+    for (path, command, description), config in zip(runs, configs):
+        if config in existing_configs:
+            transaction.ui.print(
+                f"Skipping {path}, which has the same commit and arguments as "
+                f"{existing_configs[config]}."
+            )
+            continue
+        if description is None:
+            if last_commit_message is None:
+                last_commit_message = bash.cmd("git log -1 --pretty=%B".split())
+            description = last_commit_message
+        if str(path) in existing_paths:
+            transaction.remove(path)
+        transaction.add_run(
+            path=path,
+            command=command,
+            commit=commit,
+            datetime=datetime.now().isoformat(),
+            description=description,
+            config_hash=config,
+        )
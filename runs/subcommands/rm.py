@@ -1,6 +1,6 @@
 # stdlib
 from copy import deepcopy
-from typing import List
+from typing import Iterable
 
 # first party
 from runs.arguments import DEFAULT_QUERY_ARGS, add_query_args
@@ -25,7 +25,7 @@ def add_subparser(subparsers):
 
 
 @Transaction.wrapper
-@DataBase.query
-def cli(runs: List[RunEntry], transaction, *_, **__):
+@DataBase.projected(["path"])
+def cli(runs: Iterable[RunEntry], transaction, *_, **__):
     for path in set(run.path for run in runs):
         transaction.remove(path)
@@ -0,0 +1,56 @@
+# stdlib
+import sqlite3
+
+# first party
+from runs.arguments import add_query_args
+from runs.database import DataBase
+from runs.logger import Logger
+from runs.query import Condition
+from runs.util import BOLD, RESET, highlight
+
+
+def add_subparser(subparsers):
+    parser = subparsers.add_parser(
+        "search",
+        help="Search the descriptions and commands of runs, best matches first.",
+    )
+    parser.add_argument(
+        "text",
+        help="Words to search for, in SQLite FTS5 query syntax: for example "
+        '"cosine warmup", "warm*", or "description: cosine".',
+    )
+    add_query_args(parser, with_sort=False)
+    parser.add_argument(
+        "--limit", type=int, default=20, help="Print at most this many runs."
+    )
+    parser.add_argument(
+        "--porcelain",
+        action="store_true",
+        help="Print paths only (for use with scripts)",
+    )
+    return parser
+
+
+@DataBase.open
+@DataBase.aggregate
+def cli(
+    logger: Logger,
+    db: DataBase,
+    condition: Condition,
+    text: str,
+    limit: int,
+    porcelain: bool,
+    *_,
+    **__
+):
+    try:
+        results = db.search(
+            text, condition=condition, limit=limit, start=BOLD, end=RESET
+        ).fetchall()
+    except sqlite3.OperationalError as e:
+        logger.exit(f"Could not search for {text}: {e}")
+    for path, snippet, _ in results:
+        if porcelain:
+            logger.print(path)
+        else:
+            logger.print(highlight(path, ": ", sep="") + " ".join(snippet.split()))
@@ -1,18 +1,16 @@
 # stdlib
-
-import json
-
-# first party
 from collections import defaultdict
+import itertools
+import json
 from typing import List, Set
 
+# first party
 from runs.arguments import add_query_args
 from runs.command import Command
 from runs.database import DataBase
 from runs.logger import Logger
-from runs.run_entry import RunEntry
+from runs.query import Condition
 from runs.subcommands.from_json import SpecObj
-from runs.util import get_args
 
 
 def add_subparser(subparsers):
@@ -35,9 +33,10 @@ def add_subparser(subparsers):
 
 
 @DataBase.open
-@DataBase.query
+@DataBase.aggregate
 def cli(
-    runs: List[RunEntry],
+    db: DataBase,
+    condition: Condition,
     logger: Logger,
     exclude: List[str],
     prefix: str,
@@ -45,24 +44,34 @@ def cli(
     *_,
     **__
 ):
-    if not runs:
-        logger.exit("No commands found.")
-
     exclude = set(exclude)
-    commands = [Command.from_run(run).exclude(prefix, *args) for run in runs]
     spec_dict = get_spec_obj(
-        commands=commands, exclude=exclude, prefix=prefix, logger=logger
+        db=db,
+        condition=condition,
+        excluded=Command(prefix, *args, path=None),
+        exclude=exclude,
+        prefix=prefix,
+        logger=logger,
     ).dict()
     spec_dict = {k: v for k, v in spec_dict.items() if v}
     print(json.dumps(spec_dict, sort_keys=True, indent=4))
 
 
 def get_spec_obj(
-    commands: List[Command], exclude: Set[str], prefix: str, logger: Logger
+    db: DataBase,
+    condition: Condition,
+    excluded: Command,
+    exclude: Set[str],
+    prefix: str,
+    logger: Logger,
 ):
-    positionals = commands[0].positionals
-    args = defaultdict(set)
-    flags = set()
+    """
+    Build the spec from the distinct arguments in `run_args`, leaving out those of
+    `excluded` the way `Command.exclude` does.
+    """
+    excluded_positionals = [word for word, _ in excluded.positionals]
+    excluded_keys = set(key for (key, _), _ in excluded.optionals)
+    excluded_flags = set(word for word, _ in excluded.flags)
 
     def parse(x):
         try:
@@ -73,9 +82,6 @@ def get_spec_obj(
             pass
         return x
 
-    def take_first(it):
-        return tuple([parse(x) for x, _ in it])
-
     def squeeze(x):
         try:
             y, = x
@@ -85,24 +91,36 @@ def get_spec_obj(
             pass
         return x
 
-    for command in commands:
-        if command.positionals != positionals:
-            logger.exit(
-                "Command:",
-                commands[0],
-                "and",
-                command,
-                "do not have the same positional arguments:",
-                sep="\n",
-            )
+    def include_positionals(positionals):
+        for p, p_exclude in itertools.zip_longest(positionals, excluded_positionals):
+            if p is not None and p != p_exclude:
+                yield p
+
+    positionals = set(
+        tuple(include_positionals(p)) for p in db.arg_lists(condition, "positionals")
+    )
+    if not positionals:
+        logger.exit("No commands found.")
+    if len(positionals) > 1:
+        logger.exit(
+            *[" ".join(p) for p in positionals],
+            "do not all have the same positional arguments.",
+            sep="\n",
+        )
 
-        for (k, _), v in command.optionals:
-            args[k].add(squeeze(take_first(v)))
+    args = defaultdict(set)
+    for key, value in db.arg_values(condition):
+        if key not in excluded_keys:
+            args[key].add(squeeze(tuple(parse(x) for x in value.split(" "))))
 
-        flags.add(take_first(command.flags))
+    flags = set(
+        tuple(parse(f) for f in fs if f not in excluded_flags)
+        for fs in db.arg_lists(condition, "flags")
+    )
 
     flags = list(flags)
     args = {k: squeeze(list(v)) for k, v in args.items()}
-    command = "".join([s for t in positionals for s in t])
+    positionals, = positionals
+    command = " ".join(positionals)
 
     return SpecObj(command=command, args=args, flags=flags)
@@ -0,0 +1,249 @@
+"""
+Scalars from TensorBoard event files, read without TensorFlow.
+
+An event file is a sequence of TFRecords, each of which holds an `Event` protocol
+buffer. Only the fields that lead to scalar summaries are decoded, and only in the
+records that contain the tag that was asked for, which `mmap.find` detects without
+copying the record.
+"""
+
+# stdlib
+import mmap
+from pathlib import Path
+import struct
+from typing import Iterator, List, Optional, Tuple
+
+EVENT_FILE_PATTERN = "events.out.tfevents.*"
+# a record is its length, the masked CRC of the length, the data and its masked CRC
+HEADER = struct.Struct("<QI")
+FOOTER = struct.Struct("<I")
+
+# field numbers in the protocol buffers
+EVENT_STEP, EVENT_SUMMARY = 2, 5
+SUMMARY_VALUE = 1
+VALUE_TAG, VALUE_SIMPLE_VALUE, VALUE_TENSOR = 1, 2, 8
+TENSOR_DTYPE, TENSOR_CONTENT, TENSOR_FLOAT_VAL, TENSOR_DOUBLE_VAL = 1, 4, 5, 6
+TENSOR_HALF_VAL = 13
+# TensorFlow's DataType enum
+DTYPE_FORMATS = {1: "<f", 2: "<d", 19: "<e"}
+# wire types
+VARINT, FIXED64, LENGTH_DELIMITED, FIXED32 = 0, 1, 2, 5
+
+
+def crc32c_table() -> List[int]:
+    table = []
+    for byte in range(256):
+        crc = byte
+        for _ in range(8):
+            crc = (crc >> 1) ^ (0x82F63B78 if crc & 1 else 0)
+        table.append(crc)
+    return table
+
+
+CRC32C_TABLE = crc32c_table()
+
+
+def crc32c(data: bytes) -> int:
+    crc = 0xFFFFFFFF
+    for byte in data:
+        crc = CRC32C_TABLE[(crc ^ byte) & 0xFF] ^ (crc >> 8)
+    return crc ^ 0xFFFFFFFF
+
+
+def masked_crc(data: bytes) -> int:
+    crc = crc32c(data)
+    return (((crc >> 15) | (crc << 17)) + 0xA282EAD8) & 0xFFFFFFFF
+
+
+def event_files(path: Path) -> List[Path]:
+    """
+    :return: `path` itself if it is a file, or else the event files in the directory
+    at `path` and its subdirectories, in the order in which they were created
+    """
+    if not path.is_dir():
+        return [path]
+    # the names of event files start with the time at which they were created
+    return sorted(path.rglob(EVENT_FILE_PATTERN), key=lambda p: p.name)
+
+
+def records(buffer, check_crc: bool = False) -> Iterator[Tuple[int, int]]:
+    """
+    :param buffer: the contents of an event file, e.g. as an `mmap`
+    :param check_crc: whether to check the CRCs of each record, which is slow in
+    pure Python
+    :return: the start and end of the data of each record. A record that is cut
+    short, as the last one may be while a run is writing it, ends the iteration.
+    :raise ValueError: if a CRC does not match
+    """
+    position = 0
+    while position + HEADER.size <= len(buffer):
+        length, length_crc = HEADER.unpack_from(buffer, position)
+        start = position + HEADER.size
+        end = start + length
+        if end + FOOTER.size > len(buffer):
+            return
+        if check_crc:
+            data_crc, = FOOTER.unpack_from(buffer, end)
+            if masked_crc(buffer[position : position + 8]) != length_crc:
+                raise ValueError("corrupt record length in event file")
+            if masked_crc(buffer[start:end]) != data_crc:
+                raise ValueError("corrupt record in event file")
+        yield start, end
+        position = end + FOOTER.size
+
+
+def scalars(
+    path: Path, tag: str, check_crc: bool = False
+) -> Iterator[Tuple[int, float]]:
+    """
+    :param path: an event file, or a directory of them
+    :return: the step and value of each scalar summary tagged `tag`, in the order in
+    which they were written
+    :raise ValueError: if an event file is corrupt
+    """
+    encoded_tag = tag.encode()
+    for file in event_files(path):
+        with file.open("rb") as f:
+            if file.stat().st_size == 0:
+                continue
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as buffer:
+                for start, end in records(buffer, check_crc):
+                    if buffer.find(encoded_tag, start, end) >= 0:
+                        yield from event_scalars(buffer[start:end], encoded_tag)
+
+
+def event_scalars(event: bytes, tag: bytes) -> Iterator[Tuple[int, float]]:
+    step = 0
+    summary = None
+    for number, wire_type, value in fields(event):
+        if number == EVENT_STEP:
+            check_wire_type(wire_type, VARINT)
+            step = value - 2 ** 64 if value >= 2 ** 63 else value
+        elif number == EVENT_SUMMARY:
+            check_wire_type(wire_type, LENGTH_DELIMITED)
+            summary = value
+    if summary is None:
+        return
+    for number, wire_type, summary_value in fields(summary):
+        if number == SUMMARY_VALUE:
+            check_wire_type(wire_type, LENGTH_DELIMITED)
+            value = scalar(summary_value, tag)
+            if value is not None:
+                yield step, value
+
+
+def scalar(summary_value: bytes, tag: bytes) -> Optional[float]:
+    """
+    :return: the number held by a `Summary.Value` tagged `tag`, either as a simple
+    value or as a tensor with one element, if there is one
+    """
+    value_tag = value = None
+    for number, wire_type, field in fields(summary_value):
+        if number == VALUE_TAG:
+            check_wire_type(wire_type, LENGTH_DELIMITED)
+            value_tag = field
+        elif number == VALUE_SIMPLE_VALUE:
+            check_wire_type(wire_type, FIXED32)
+            value, = struct.unpack("<f", field)
+        elif number == VALUE_TENSOR:
+            check_wire_type(wire_type, LENGTH_DELIMITED)
+            value = tensor_scalar(field)
+    return value if value_tag == tag else None
+
+
+def tensor_scalar(tensor: bytes) -> Optional[float]:
+    dtype = 0
+    content = None
+    values = []
+    for number, wire_type, field in fields(tensor):
+        if number == TENSOR_DTYPE:
+            check_wire_type(wire_type, VARINT)
+            dtype = field
+        elif number == TENSOR_CONTENT:
+            check_wire_type(wire_type, LENGTH_DELIMITED)
+            content = field
+        elif number == TENSOR_FLOAT_VAL:
+            # repeated fields are packed, or sent one element per field
+            check_wire_type(wire_type, LENGTH_DELIMITED, FIXED32)
+            values += unpack_repeated("<f", field)
+        elif number == TENSOR_DOUBLE_VAL:
+            check_wire_type(wire_type, LENGTH_DELIMITED, FIXED64)
+            values += unpack_repeated("<d", field)
+        elif number == TENSOR_HALF_VAL:
+            check_wire_type(wire_type, LENGTH_DELIMITED, VARINT)
+            values += [half(bits) for bits in unpack_varints(field)]
+    if content is not None and dtype in DTYPE_FORMATS:
+        values = unpack_repeated(DTYPE_FORMATS[dtype], content)
+    return values[0] if len(values) == 1 else None
+
+
+def unpack_repeated(fmt: str, field: bytes) -> List[float]:
+    """
+    :param field: a packed repeated field, or a single fixed-size one
+    """
+    size = struct.calcsize(fmt)
+    return [v for v, in struct.iter_unpack(fmt, field[: len(field) // size * size])]
+
+
+def unpack_varints(field) -> List[int]:
+    if isinstance(field, int):
+        return [field]
+    values = []
+    position = 0
+    while position < len(field):
+        value, position = varint(field, position)
+        values.append(value)
+    return values
+
+
+def half(bits: int) -> float:
+    value, = struct.unpack("<e", struct.pack("<H", bits & 0xFFFF))
+    return value
+
+
+def varint(data: bytes, position: int) -> Tuple[int, int]:
+    """
+    :return: the variable-length integer at `position` and the position after it
+    """
+    result = shift = 0
+    for position in range(position, len(data)):
+        byte = data[position]
+        result |= (byte & 0x7F) << shift
+        if byte < 0x80:
+            return result, position + 1
+        shift += 7
+    raise ValueError("malformed event")
+
+
+def check_wire_type(wire_type: int, *expected: int):
+    """
+    :raise ValueError: if a field does not have the wire type that its number calls
+    for, which would otherwise make it decode as the wrong type
+    """
+    if wire_type not in expected:
+        raise ValueError("malformed event")
+
+
+def fields(message: bytes) -> Iterator[Tuple[int, int, object]]:
+    """
+    :return: the number, wire type and value of each field of a protocol buffer: an
+    int for varints, and bytes for the other wire types
+    """
+    position = 0
+    while position < len(message):
+        key, position = varint(message, position)
+        number, wire_type = key >> 3, key & 7
+        if wire_type == VARINT:
+            value, position = varint(message, position)
+            yield number, wire_type, value
+            continue
+        if wire_type == LENGTH_DELIMITED:
+            size, position = varint(message, position)
+        elif wire_type in (FIXED64, FIXED32):
+            size = 8 if wire_type == FIXED64 else 4
+        else:
+            raise ValueError("malformed event")
+        if position + size > len(message):
+            raise ValueError("malformed event")
+        yield number, wire_type, message[position : position + size]
+        position += size
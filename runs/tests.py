@@ -1,10 +1,17 @@
 # stdlib
 from contextlib import contextmanager
+from datetime import timedelta
 from fnmatch import fnmatch
+import json
+import math
 import os
 from pathlib import Path
+import random
 import shutil
+import sqlite3
+import struct
 import subprocess
+import tempfile
 
 # third party
 # first party
@@ -17,12 +24,46 @@ from nose.tools import (
     eq_,
     ok_,
 )
-
-from runs import main
-from runs.database import DataBase
+import numpy as np
+
+from runs import main, migrations, sampling, tensorboard
+from runs.command import Command, config_hash
+from runs.database import (
+    COMPOUND_SELECT_TERMS,
+    FETCH_SIZE,
+    TEMP_TABLE_THRESHOLD,
+    DataBase,
+    command_arg_num,
+    command_args,
+    command_has_flag,
+)
 from runs.logger import UI
+from runs.metrics import READERS, error_summary, metric_values, read_scalar, reader
+from runs.pattern import compile_like
+from runs.query import (
+    Any,
+    Arg,
+    Equals,
+    Glob,
+    HasFlag,
+    In,
+    Like,
+    Prefix,
+    parse_where,
+    plan,
+)
+from runs.run_entry import RunEntry
 from runs.shell import Bash
-from runs.subcommands import lookup, ls
+from runs.subcommands import correlate, dedup, from_json, lookup, ls
+from runs.transaction.transaction import Transaction
+from runs.util import (
+    EPOCH,
+    PurePath,
+    epoch_microseconds,
+    natural_compare,
+    natural_order,
+    parse_isoformat,
+)
 
 # TODO: sad path
 
@@ -279,6 +320,84 @@ def test_move():
                 kill_session(new_path)
 
 
+def test_from_json_jsonl():
+    with _setup(TEST_RUN):
+        spec = Path(WORK_DIR, "spec.jsonl")
+        lines = [dict(command=COMMAND, args=dict(option=i)) for i in range(3)]
+        spec.write_text("\n".join(map(json.dumps, lines)))
+        run_main("from-json", str(spec), "--path=sweep", "--jsonl", "--chunk-size=2")
+        with DB as db:
+            runs = sorted(db.get(["sweep/%"]), key=lambda run: str(run.path))
+            eq_([str(run.path) for run in runs], ["sweep/0", "sweep/1", "sweep/2"])
+            assert_in('--option="2"', str(runs[2].command))
+        for i in range(3):
+            kill_session(f"sweep/{i}")
+        for bad_line in ['{"command"', '["ab"]']:
+            spec.write_text(bad_line)
+            with assert_raises(SystemExit):
+                run_main("from-json", str(spec), "--path=bad", "--jsonl")
+        with assert_raises(SystemExit):
+            run_main("from-json", str(spec), "--path=bad", "--jsonl", "--chunk-size=0")
+
+
+def test_from_json_max_runs():
+    with _setup(TEST_RUN):
+        spec = Path(WORK_DIR, "spec.json")
+        objs = [
+            dict(command=COMMAND, args=dict(option=[])),
+            dict(command=COMMAND, args=dict(option=[1, 2, 3, 4, 5])),
+        ]
+        spec.write_text(json.dumps(objs))
+        run_main(
+            "from-json", str(spec), "--path=sample", "--strategy=random", "--max-runs=4"
+        )
+        with DB as db:
+            paths = sorted(str(run.path) for run in db.get(["sample/%"]))
+        eq_(paths, [f"sample/{i}" for i in range(4)])
+        for path in paths:
+            kill_session(path)
+
+
+def test_config_hash():
+    def config(command, commit="abc", excluded=()):
+        return config_hash(commit, Command(command, path=None).exclude(*excluded))
+
+    eq_(
+        config("python t.py --lr 1 -c --seed=2"),
+        config("python t.py --seed '2' -c --lr=1"),
+    )
+    ok_(config("python t.py --lr 1") != config("python t.py --lr 2"))
+    ok_(config("python t.py --lr 1") != config("python t.py --lr 1", commit="def"))
+    eq_(
+        config("python t.py --lr 1 --gpu=0", excluded=["--gpu=0"]),
+        config("python t.py --lr 1"),
+    )
+    with _setup(TEST_RUN):
+        for path in ["copy", "new"]:
+            # TEST_RUN is started with the same command
+            run_main("new", f"--path={path}", f"--command={COMMAND}", "--skip-existing")
+        with DB as db:
+            eq_(db.get(["copy", "new"]), [])
+            run, = db.get([TEST_RUN])
+            configs = db.paths_with_configs([run.config_hash, "x"])
+            eq_(configs, {run.config_hash: TEST_RUN})
+
+
+def test_dedup():
+    with _setup(TEST_RUN):
+        run_main("new", "--path=copy", f"--command={COMMAND}")
+        with DB as db:
+            # a run from before config hashes were stored
+            db.conn.execute("UPDATE runs SET config_hash = NULL WHERE path = 'copy'")
+            groups = dedup.duplicates(db, db.condition(["%"]), None, [])
+            eq_(list(groups.values()), [[TEST_RUN, "copy"]])
+            eq_(dedup.strings(groups, porcelain=True), ["copy"])
+            # the hash is not stored
+            run, = db.get(["copy"])
+            eq_(run.config_hash, None)
+        kill_session("copy")
+
+
 def move(src, dest):
     run_main("mv", src, dest)
 
@@ -364,3 +483,476 @@ def test_move_dirs():
     #     move('test_run%', 'test_run2')
     #     yield check_move, 'test_run1', 'test_run2/test_run1'
     #     yield check_move, 'test_run2', 'test_run2/test_run2'
+
+
+def test_query_compile():
+    def condition():
+        return Any(Like("path", "a%"), Like("path", "b")) & ~Any(Like("path", "c"))
+
+    compiled = condition().compile()
+    eq_(
+        compiled.sql,
+        "(((path LIKE (?)) OR (path LIKE (?))) AND (NOT ((path LIKE (?)))))",
+    )
+    eq_(compiled.params, ("a%", "b", "c"))
+    # structurally identical trees share one compiled object
+    ok_(condition().compile() is compiled)
+
+
+def test_like():
+    conn = sqlite3.connect(":memory:")
+    rng = random.Random(0)
+    alphabet = "aAbB/%_\\\n\u00e9\u00c9\u212a"
+    for _ in range(2000):
+        value = "".join(rng.choices(alphabet, k=rng.randrange(6)))
+        like = "".join(rng.choices(alphabet, k=rng.randrange(6)))
+        for escape in [None, "\\"]:
+            if escape is None:
+                expected, = conn.execute("SELECT ? LIKE ?", (value, like)).fetchone()
+            else:
+                sql = "SELECT ? LIKE ? ESCAPE ?"
+                expected, = conn.execute(sql, (value, like, escape)).fetchone()
+            eq_(compile_like(like, escape)(value), bool(expected))
+    ok_(compile_like("a%", case_sensitive=True)("ab"))
+    ok_(not compile_like("a%", case_sensitive=True)("Ab"))
+    with assert_raises(ValueError):
+        compile_like("a", escape="ab")
+
+
+def test_query_plan():
+    condition = Any(Any(Like("path", "a"), Like("path", "b")), Like("path", "a"))
+    eq_(plan(condition), Any(Like("path", "a"), Like("path", "b")))
+    eq_(plan(condition, case_sensitive=True), In("path", "a", "b"))
+    eq_(plan(Any(Like("path", "a")), case_sensitive=True), Equals("path", "a"))
+    eq_(plan(~~Like("path", "a_%")), Like("path", "a_%"))
+    eq_(plan(Like("path", "a_%*"), case_sensitive=True), Glob("path", "a?*[*]"))
+    eq_(plan(Like("path", "a/%"), case_sensitive=True), Prefix("path", "a/"))
+
+
+def test_case_sensitivity():
+    with tempfile.TemporaryDirectory() as directory:
+        with DataBase(Path(directory, "runs.db"), LOGGER) as db:
+            for path in ["a/x1", "a/x_1"]:
+                db.append(RunEntry(path, COMMAND, "", "2019-03-01T12:30:00", ""))
+
+            def paths(patterns, case_sensitive):
+                condition = db.condition(patterns, case_sensitive=case_sensitive)
+                return sorted(str(run.path) for run in db.where(condition))
+
+            # enough literal paths to be joined through a temporary table
+            many = [f"b/{i}" for i in range(TEMP_TABLE_THRESHOLD)]
+            for patterns in [["A/%"], ["A/X1", "A/X_1"], ["A/X1", "A/X_1", *many]]:
+                eq_(paths(patterns, case_sensitive=False), ["a/x1", "a/x_1"])
+                eq_(paths(patterns, case_sensitive=True), [])
+                lower = [p.lower() for p in patterns]
+                eq_(paths(lower, case_sensitive=True), ["a/x1", "a/x_1"])
+            plan_details = db.explain(db.condition(["A/%"]))
+            ok_(any("runs_path_nocase" in line for line in plan_details))
+
+
+def test_command_args():
+    eq_(
+        json.loads(command_args("python train.py --cuda --lr=0.1 --name a b")),
+        [
+            [0, None, "python", None],
+            [1, None, "train.py", None],
+            [2, "--cuda", None, None],
+            [3, "--lr", "0.1", 0.1],
+            [4, "--name", "a b", None],
+        ],
+    )
+
+
+def test_run_args():
+    with _setup(TEST_RUN, args=["--option=1"]), DB as db:
+        eq_(list(db.arg_values(db.condition([TEST_RUN]))), [("--option", "1")])
+        run_main("mv", TEST_RUN, "moved")
+        eq_(list(db.arg_values(db.condition(["moved"]))), [("--option", "1")])
+        run_main("rm", "moved")
+        eq_(list(db.arg_values(db.condition(["%"]))), [])
+
+
+def test_where():
+    eq_(
+        parse_where("lr < 1e-3 and (seed in (0, 1) or not cuda)"),
+        Arg("lr", "<", 1e-3) & (Arg("seed", "IN", 0.0, 1.0) | ~HasFlag("cuda")),
+    )
+    eq_(parse_where("name != 'a b'"), Arg("name", "!=", "a b"))
+    for expression in ["lr <", "lr < 1)", "seed in 0"]:
+        with assert_raises(ValueError):
+            parse_where(expression)
+    eq_(command_arg_num("python train.py --lr=1e-3", "lr"), 1e-3)
+    ok_(command_has_flag("python train.py --cuda", "--cuda"))
+
+
+def test_search():
+    with _setup(TEST_RUN), DB as db:
+        eq_([path for path, *_ in db.search("command")], [TEST_RUN])
+        run_main("change-description", TEST_RUN, "cosine warmup")
+        eq_(list(db.search("command")), [])
+        (path, snippet, _), = db.search("warm*", db.condition([TEST_RUN]))
+        eq_((path, snippet), (TEST_RUN, "cosine [warmup]"))
+        eq_(list(db.search("warmup", db.condition(["x%"]))), [])
+        # search runs its own full-text query, which --explain would not describe
+        with assert_raises(SystemExit):
+            run_main("search", "--explain", "warmup")
+        run_main("ls", "--explain", TEST_RUN)
+
+
+def test_existing():
+    with _setup(TEST_RUN), DB as db:
+        paths = [TEST_RUN, "test_%", "x%", "missing"]
+        eq_(db.existing(paths), {TEST_RUN, "test_%"})
+        # the underscore makes these patterns, of which there are more than fit in
+        # one compound SELECT
+        many = [f"{TEST_RUN}/{i}" for i in range(3 * COMPOUND_SELECT_TERMS)]
+        eq_(db.existing([*many, TEST_RUN]), {TEST_RUN})
+        # and more paths than are bound as parameters
+        many = many[: TEMP_TABLE_THRESHOLD + 1]
+        eq_(db.existing_paths([*many, TEST_RUN, "test_%"]), {TEST_RUN})
+        ok_(TEST_RUN in db)
+        ok_("missing" not in db)
+
+
+def test_migrations():
+    with tempfile.TemporaryDirectory() as directory:
+        path = Path(directory, "runs.db")
+        conn = sqlite3.connect(str(path))
+        # the schema before migrations
+        conn.execute(
+            "CREATE TABLE runs ('path' text NOT NULL PRIMARY KEY, "
+            "'command' text NOT NULL, 'commit' text NOT NULL, "
+            "'datetime' text NOT NULL, 'description' text NOT NULL)"
+        )
+        times = ["2019-03-01T12:30:00", "2019-03-01T12:30:00.000100"]
+        conn.executemany(
+            "INSERT INTO runs VALUES (?, 'python3 test.py --option=1', '', ?, '')",
+            [(str(i), time) for i, time in enumerate(times)],
+        )
+        conn.commit()
+        conn.close()
+        with DataBase(path, LOGGER, read_only=True) as db:
+            eq_(migrations.version(db.conn), len(migrations.MIGRATIONS))
+            eq_([run.datetime for run in db.get(["%"], order="path")], times)
+            eq_(list(db.arg_values(db.condition(["0"]))), [("--option", "1")])
+            eq_(
+                db.conn.execute("SELECT typeof(datetime) FROM runs").fetchone(),
+                ("integer",),
+            )
+            eq_({run.config_hash for run in db.get(["%"])}, {None})
+
+
+def test_epoch_microseconds():
+    for time in ["2019-03-01T12:30:00", "2019-03-01T12:30:00.000100"]:
+        microseconds = epoch_microseconds(parse_isoformat(time))
+        eq_((EPOCH + timedelta(microseconds=microseconds)).isoformat(), time)
+
+
+def test_stream():
+    paths = [f"run{i}" for i in range(FETCH_SIZE + 5)]
+    with tempfile.TemporaryDirectory() as directory:
+        with DataBase(Path(directory, "runs.db"), LOGGER) as db:
+            with db.batch():
+                for path in paths:
+                    db.append(RunEntry(path, COMMAND, "", "2019-03-01T12:30:00", ""))
+            runs = db.stream(["%"], order="path")
+            # rows are fetched as they are consumed
+            ok_(not isinstance(runs, list))
+            first = next(runs)
+            eq_((type(first), first.path), (RunEntry, PurePath("run0")))
+            eq_([str(run.path) for run in runs], paths[1:])
+
+
+def test_projection():
+    ok_(RunEntry.projection(*RunEntry._fields) is RunEntry)
+    with tempfile.TemporaryDirectory() as directory:
+        with DataBase(Path(directory, "runs.db"), LOGGER) as db:
+            db.append(RunEntry("a", COMMAND, "abc", "2019-03-01T12:30:00", ""))
+            run, = db.get(["%"], columns=["commit"])
+            # `path` always comes first
+            eq_(run._fields, ("path", "commit"))
+            ok_(type(run) is RunEntry.projection("path", "commit"))
+            eq_(run.asdict(), dict(path=PurePath("a"), commit="abc"))
+            eq_((run.get("commit"), str(run)), ("abc", "'a','abc'"))
+            with assert_raises(RunEntry.KeyError):
+                run.get("command")
+
+
+def test_natural_order():
+    ok_(natural_compare("run2", "run10") < 0)
+    ok_(natural_compare("run10", "run2") > 0)
+    eq_(natural_compare("run02", "run2"), 0)
+    ok_(natural_compare("a/run9/x", "a/run10") < 0)
+    eq_(sorted(["run10", "run2", "run1"], key=natural_order), ["run1", "run2", "run10"])
+    paths = ["run10", "run2", "b", "run1/10", "run1/9"]
+    with tempfile.TemporaryDirectory() as directory:
+        with DataBase(Path(directory, "runs.db"), LOGGER) as db:
+            for path in paths:
+                db.append(RunEntry(path, COMMAND, "", "2019-03-01T12:30:00", ""))
+            runs = db.get(["%"], order="path")
+            eq_([str(run.path) for run in runs], sorted(paths, key=natural_order))
+
+
+def test_read_only():
+    with tempfile.TemporaryDirectory() as directory:
+        path = Path(directory, "runs.db")
+        with DataBase(path, LOGGER) as db:
+            db.append(RunEntry("a", COMMAND, "", "2019-03-01T12:30:00", ""))
+
+        def schema():
+            conn = sqlite3.connect(str(path))
+            try:
+                return conn.execute("SELECT sql FROM sqlite_master").fetchall()
+            finally:
+                conn.close()
+
+        before = schema(), path.stat().st_mtime_ns
+        with DataBase(path, LOGGER, read_only=True) as db:
+            ok_(db.read_only)
+            eq_(db.conn.execute("PRAGMA query_only").fetchone(), (1,))
+            eq_([str(run.path) for run in db.get(["%"])], ["a"])
+            for sql in ["DELETE FROM runs", "CREATE TABLE t (x text)"]:
+                with assert_raises(sqlite3.OperationalError):
+                    db.conn.execute(sql)
+        # neither migrations nor any other DDL ran
+        eq_((schema(), path.stat().st_mtime_ns), before)
+
+
+def test_write_retries():
+    with tempfile.TemporaryDirectory() as directory:
+        path = Path(directory, "runs.db")
+        with DataBase(path, LOGGER, journal_mode="wal", busy_timeout=0.01) as db:
+            eq_(db.conn.execute("PRAGMA journal_mode").fetchone(), ("wal",))
+            eq_(db.conn.execute("PRAGMA busy_timeout").fetchone(), (10,))
+            other = sqlite3.connect(str(path))
+            other.execute("BEGIN IMMEDIATE")
+            attempts = []
+
+            def write():
+                attempts.append(None)
+                if len(attempts) == 2:
+                    other.rollback()
+                db.conn.execute("BEGIN IMMEDIATE")
+                db.conn.rollback()
+                return "written"
+
+            # the first attempt finds the database locked
+            eq_((db.retry(write), len(attempts)), ("written", 2))
+            other.execute("BEGIN IMMEDIATE")
+            with assert_raises(RuntimeError):
+                with db.batch():
+                    db.append(RunEntry("a", COMMAND, "", "2019-03-01T12:30:00", ""))
+            other.rollback()
+            other.close()
+            eq_(db.get(["%"]), [])
+
+
+def test_batch_failure():
+    with tempfile.TemporaryDirectory() as directory:
+        with DataBase(Path(directory, "runs.db"), LOGGER) as db:
+            transaction = Transaction(db=db, ui=LOGGER, root=directory, dir_names=[])
+            for path in ["a", "b"]:
+                transaction.add_run(
+                    path=PurePath(path),
+                    command=COMMAND,
+                    commit="",
+                    datetime="2019-03-01T12:30:00",
+                    description="",
+                )
+
+            def process(run):
+                # e.g. tmux fails to start the second run
+                if str(run.path) == "b":
+                    raise RuntimeError
+                db.append(run)
+
+            new_run = transaction.sub_transactions.new_run
+            # there is no repo to check for uncommitted changes
+            new_run.validate = lambda: None
+            new_run.process = process
+            with assert_raises(RuntimeError):
+                transaction.commit()
+            # the run that was started is still recorded
+            eq_([str(run.path) for run in db.get(["%"])], ["a"])
+
+
+def test_metric_cache_non_finite():
+    with tempfile.TemporaryDirectory() as directory:
+        with DataBase(Path(directory, "runs.db"), LOGGER) as db:
+            for path, value in dict(a="nan", b="inf", c="1.5").items():
+                db.append(RunEntry(path, COMMAND, "", "2019-03-01T12:30:00", ""))
+                Path(directory, path).write_text(value)
+            value_path = Path(directory, "<path>")
+            # the second time, the values come from the cache
+            for _ in range(2):
+                paths, values = correlate.metric_array(
+                    LOGGER, db, ["a", "b", "c"], value_path, "scalar", workers=1
+                )
+                eq_((paths, values.tolist()), (["c"], [1.5]))
+                values, errors = metric_values(db, ["a", "b", "c"], value_path)
+                ok_(math.isnan(values["a"]))
+                eq_((values["b"], values["c"], errors), (math.inf, 1.5, {}))
+
+
+def test_metric_cache():
+    reads = []
+
+    def read(path):
+        reads.append(path)
+        return read_scalar(path)
+
+    READERS["counting"] = lambda _: read
+    try:
+        with tempfile.TemporaryDirectory() as directory:
+            with DataBase(Path(directory, "runs.db"), LOGGER) as db:
+                for path in ["a", "b"]:
+                    db.append(RunEntry(path, COMMAND, "", "2019-03-01T12:30:00", ""))
+                    Path(directory, path).write_text("1.5")
+                value_path = Path(directory, "<path>")
+                for expected_reads in [2, 2]:
+                    values, errors = metric_values(
+                        db, ["a", "b", "c"], value_path, "counting"
+                    )
+                    eq_(values, dict(a=1.5, b=1.5))
+                    eq_(list(errors), [Path(directory, "c")])
+                    eq_(len(reads), expected_reads)
+                Path(directory, "a").write_text("2.25")
+                values, _ = metric_values(db, ["a", "b"], value_path, "counting")
+                eq_((values["a"], len(reads)), (2.25, 3))
+    finally:
+        del READERS["counting"]
+
+
+def test_readers():
+    with tempfile.TemporaryDirectory() as directory:
+        path = Path(directory, "metrics")
+        path.write_text(json.dumps(dict(eval=[dict(score=0.5), dict(score=0.75)])))
+        eq_(reader("json:eval.1.score")(path), 0.75)
+        assert_raises(ValueError, reader("json:eval.2.score"), path)
+        path.write_text("step,score\n1,0.5\n2,\n3,0.25\n")
+        eq_(reader("csv-last:score")(path), 0.25)
+        eq_(reader("csv-max:score")(path), 0.5)
+        assert_raises(ValueError, reader("csv-min:loss"), path)
+    assert_raises(ValueError, reader, "hdf5:score")
+    errors = {Path(str(i)): "no such file or directory" for i in range(4)}
+    eq_(error_summary(errors), ["4 file(s) no such file or directory: 0, 1, 2, ..."])
+
+
+def test_tensorboard():
+    def varint(n):
+        encoded = b""
+        while n > 0x7F:
+            encoded += bytes([n & 0x7F | 0x80])
+            n >>= 7
+        return encoded + bytes([n])
+
+    def field(number, wire_type, value: bytes):
+        if wire_type == 2:
+            value = varint(len(value)) + value
+        return varint(number << 3 | wire_type) + value
+
+    def record(data):
+        length = struct.pack("<Q", len(data))
+        crcs = [struct.pack("<I", tensorboard.masked_crc(d)) for d in [length, data]]
+        return length + crcs[0] + data + crcs[1]
+
+    def event(step, tag, value, tensor=False):
+        if tensor:
+            value = field(1, 0, b"\x01") + field(4, 2, struct.pack("<f", value))
+            value = field(8, 2, value)
+        else:
+            value = field(2, 5, struct.pack("<f", value))
+        summary = field(1, 2, field(1, 2, tag.encode()) + value)
+        return record(field(2, 0, varint(step)) + field(5, 2, summary))
+
+    eq_(tensorboard.crc32c(b"123456789"), 0xE3069283)
+    with tempfile.TemporaryDirectory() as directory:
+        path = Path(directory, "events.out.tfevents.1.host")
+        events = [
+            record(field(3, 2, b"brain.Event:2")),
+            event(1, "loss", 0.5),
+            event(2, "eval/loss", 9.0),
+            event(200, "loss", 0.25, tensor=True),
+        ]
+        # a record that is still being written
+        path.write_bytes(b"".join(events) + events[1][:-3])
+        scalars = tensorboard.scalars(path, "loss", check_crc=True)
+        eq_(list(scalars), [(1, 0.5), (200, 0.25)])
+        eq_(reader("tb-max:loss")(Path(directory)), 0.5)
+        eq_(reader("tb-last:eval/loss")(Path(directory)), 9.0)
+        assert_raises(ValueError, reader("tb-min:accuracy"), path)
+        path.write_bytes(events[1][:-1] + b"\x00")
+        scalars = tensorboard.scalars(path, "loss", check_crc=True)
+        assert_raises(ValueError, list, scalars)
+        # fields with the wrong wire type, without CRC checks to catch them
+        tag = field(1, 2, b"loss")
+        for summary in [
+            field(1, 2, tag + field(2, 2, b"\x00\x00\x00")),
+            field(1, 0, varint(1)) + field(1, 2, tag),
+        ]:
+            path.write_bytes(record(field(5, 2, summary)))
+            assert_raises(ValueError, list, tensorboard.scalars(path, "loss"))
+        path.write_bytes(record(field(5, 0, varint(1)) + field(1, 2, tag)))
+        assert_raises(ValueError, reader("tb-last:loss"), path)
+
+
+def test_correlate():
+    keyword_args = [("a", "--lr", "1"), ("a", "--cuda", None), ("b", "--lr", "2")]
+    args, design = correlate.design_matrix(
+        keyword_args, paths=["a", "b"], excluded=Command("--cuda", path=None)
+    )
+    eq_(args, ["--lr=1", "--lr=2"])
+    eq_(design.tolist(), [[1, 0], [0, 1]])
+    eq_(correlate.pearson(design, np.array([1.0, 3.0])).tolist(), [-1, 1])
+    eq_(correlate.pearson(design, np.array([1.0, 1.0])).tolist(), [math.inf] * 2)
+
+
+def test_sensitivities():
+    keyword_args = [
+        ("a", "--lr", "1", 1.0),
+        ("b", "--lr", "2", 2.0),
+        ("c", "--lr", "4", 4.0),
+        ("a", "--optimizer", "adam", None),
+        ("b", "--optimizer", "sgd", None),
+        ("c", "--optimizer", "adam", None),
+        ("a", "--cuda", None, None),
+    ]
+    numeric_keys, numbers, categorical_keys, categories = correlate.key_matrices(
+        keyword_args, paths=["a", "b", "c"], excluded=Command(path=None)
+    )
+    eq_(numeric_keys, ["--lr", "--cuda"])
+    eq_(numbers.tolist(), [[1, 1], [2, 0], [4, 0]])
+    eq_((categorical_keys, categories.tolist()), (["--optimizer"], [[0], [1], [0]]))
+    ranks = correlate.ranks(np.array([[3, np.nan], [1, 2], [3, 2]]))
+    eq_(np.nan_to_num(ranks, nan=-1).tolist(), [[2.5, -1], [1, 1.5], [2.5, 1.5]])
+    numbers = np.array([[1], [2], [np.nan], [4]])
+    values = np.array([1.0, 2.0, 5.0, 3.0])
+    eq_(correlate.pearson_where_present(numbers, values).round(6).tolist(), [0.981981])
+    eq_(correlate.pearson_where_present(numbers, np.ones(4)).tolist(), [math.inf])
+    categories = np.array([[0, 0], [0, 1], [1, 0], [1, 1]])
+    eq_(correlate.eta_squared(categories, np.array([1, 1, 3, 3.0])).tolist(), [1, 0])
+
+
+def test_sample_indices():
+    sample = from_json.sample_indices(10 ** 30, 1000, random.Random(0))
+    eq_(len(sample), 1000)
+    ok_(all(0 <= i < 10 ** 30 for i in sample))
+    eq_(sample, from_json.sample_indices(10 ** 30, 1000, random.Random(0)))
+    eq_(from_json.sample_indices(5, 5, random.Random(0)), set(range(5)))
+
+
+def test_sampling():
+    class Unshifted(random.Random):
+        def getrandbits(self, k):
+            return 0
+
+    points = list(sampling.sobol_points(3, 4, Unshifted()))
+    eq_(points, [(0, 0, 0), (0.5, 0.5, 0.5), (0.75, 0.25, 0.25), (0.25, 0.75, 0.75)])
+    assert_raises(ValueError, sampling.sobol_points, 100, 4, random.Random(0))
+    for strategy in sampling.STRATEGIES.values():
+        points = list(strategy(3, 8, random.Random(0)))
+        eq_(points, list(strategy(3, 8, random.Random(0))))
+        ok_(all(0 <= x < 1 for point in points for x in point))
+    points = sampling.latin_hypercube_points(2, 10, random.Random(0))
+    for coordinates in zip(*points):
+        eq_(sorted(int(x * 10) for x in coordinates), list(range(10)))
@@ -32,4 +32,4 @@ class ChangeDescriptionTransaction(SubTransaction):
         }
 
     def process(self, change: DescriptionChange):
-        self.db.update(change.path, description=change.new_description)
+        self.db.update_path(change.path, description=change.new_description)
@@ -44,4 +44,4 @@ class MoveTransaction(SubTransaction):
                 tmux.kill()
             else:
                 tmux.rename(move.dest)
-            self.db.update(move.src, path=move.dest)
+            self.db.update_path(move.src, path=move.dest)
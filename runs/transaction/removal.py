@@ -13,4 +13,4 @@ class RemovalTransaction(SubTransaction):
     def process(self, path: PurePath):
         self.tmux(path).kill()
         self.file_system.rmdirs(path)
-        del self.db[path]
+        self.db.delete_path(path)
@@ -6,7 +6,11 @@ from typing import List
 
 # first party
 from runs.command import Command
-from runs.database import DataBase
+from runs.database import (
+    DEFAULT_BUSY_TIMEOUT,
+    DEFAULT_JOURNAL_MODE,
+    DataBase,
+)
 from runs.file_system import FileSystem
 from runs.logger import UI
 from runs.run_entry import RunEntry
@@ -31,9 +35,24 @@ class Transaction:
     @staticmethod
     def wrapper(func):
         @wraps(func)
-        def _wrapper(db_path, quiet, assume_yes, root, dir_names, *args, **kwargs):
+        def _wrapper(
+            db_path,
+            quiet,
+            assume_yes,
+            root,
+            dir_names,
+            *args,
+            journal_mode=DEFAULT_JOURNAL_MODE,
+            busy_timeout=DEFAULT_BUSY_TIMEOUT,
+            **kwargs
+        ):
             ui = UI(assume_yes=assume_yes, quiet=quiet)
-            with DataBase(path=db_path, logger=ui) as db:
+            with DataBase(
+                path=db_path,
+                logger=ui,
+                journal_mode=journal_mode,
+                busy_timeout=busy_timeout,
+            ) as db:
                 transaction = Transaction(ui=ui, db=db, root=root, dir_names=dir_names)
                 with transaction as open_transaction:
                     return func(
@@ -66,6 +85,13 @@ class Transaction:
         return self
 
     def __exit__(self, *args):
+        self.commit()
+
+    def commit(self):
+        """
+        Validate and process everything queued so far, and empty the queues.
+        """
+
         def sort(st: SubTransaction):
             st.queue = sorted(st.queue, key=lambda x: natural_order(str(x)))
 
@@ -76,12 +102,20 @@ class Transaction:
             for x in st.queue:
                 st.process(x)
 
-        for process in [sort, validate, execute]:
+        def process_all(process):
             for sub_transaction in self.sub_transactions:
                 assert isinstance(sub_transaction, SubTransaction)
                 if sub_transaction.queue:
                     process(sub_transaction)
 
+        process_all(sort)
+        process_all(validate)
+        # database writes are queued and flushed together in one SQL transaction
+        with self.db.batch():
+            process_all(execute)
+        for sub_transaction in self.sub_transactions:
+            sub_transaction.queue = set()
+
     def add_run(
         self,
         path: PurePath,
@@ -89,6 +123,7 @@ class Transaction:
         commit: str,
         datetime: str,
         description: str,
+        config_hash: str = None,
     ):
         self.sub_transactions.new_run.add(
             RunEntry(
@@ -97,6 +132,7 @@ class Transaction:
                 commit=commit,
                 datetime=datetime,
                 description=description,
+                config_hash=config_hash,
             )
         )
 
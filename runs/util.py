@@ -1,6 +1,7 @@
 # stdlib
 import argparse
-from datetime import datetime
+from datetime import datetime, timedelta, timezone
+from functools import lru_cache
 from pathlib import Path, PurePath
 import re
 import shutil
@@ -17,6 +18,8 @@ RESET = "\033[0;0m"
 BOLD = "\033[;1m"
 REVERSE = "\033[;7m"
 
+EPOCH = datetime(1970, 1, 1)
+
 
 def highlight(*args, sep=" "):
     return GREEN + sep.join(map(str, args)) + RESET
@@ -73,8 +76,17 @@ def interpolate_keywords(path, string):
     return string
 
 
+@lru_cache(maxsize=2 ** 16)
 def natural_order(text):
-    return [int(c) if c.isdigit() else c for c in re.split("(\d+)", text)]
+    return [int(c) if c.isdecimal() else c for c in re.split("(\d+)", text)]
+
+
+def natural_compare(a: str, b: str) -> int:
+    """
+    Comparison function for the NATURAL collation registered with SQLite.
+    """
+    a, b = natural_order(a), natural_order(b)
+    return (a > b) - (a < b)
 
 
 def parse_arg(arg: str, delims: str = "=| ") -> List[str]:
@@ -120,3 +132,27 @@ def get_args(command: Command, exclude: Set[str]):
                 yield key, value
     except IndexError:
         yield None, None
+
+
+def epoch_microseconds(time: datetime) -> int:
+    """
+    :return: the number of microseconds from the epoch to `time`. Naive times count
+    as UTC, so that they convert back to the same isoformat.
+    """
+    if time.tzinfo is not None:
+        time = time.astimezone(timezone.utc).replace(tzinfo=None)
+    return (time - EPOCH) // timedelta(microseconds=1)
+
+
+def parse_isoformat(string: str) -> datetime:
+    """
+    Parse the naive times that `datetime.isoformat` writes, since Python 3.6 has no
+    `datetime.fromisoformat`.
+    """
+    string = string.replace(" ", "T", 1)
+    for time_format in ["%Y-%m-%dT%H:%M:%S.%f", "%Y-%m-%dT%H:%M:%S"]:
+        try:
+            return datetime.strptime(string, time_format)
+        except ValueError:
+            pass
+    raise ValueError(f"{string} is not in isoformat")
@@ -32,6 +32,7 @@ setup(
     ],
     keywords="tensorflow utilities development",
     packages=find_packages(),
+    install_requires=["numpy"],
     entry_points={
         "console_scripts": [
             "runs = runs.main:main",